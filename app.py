@@ -1,6 +1,7 @@
 import streamlit as st
 import json
-import time  # For simulating the progress bar
+import os
+import time
 import polars as pl
 from open_ai_market_insigth import (
     fetch_search_results, 
@@ -11,17 +12,65 @@ from open_ai_market_insigth import (
     search
 )
 
-# Load data from external JSON file
-with open("kraft_market_insigths.json") as f:
-    data = json.load(f)
+from data_store import load_store
+from jobs import JobQueue, start_workers
 
-# Load provocations data from JSON file (assumed to be a list of dictionaries)
-with open("DATA/Kraft_topics_provocations.json") as prov_file:
-    provocations_data = json.load(prov_file)
 
-# Load Topic Evolution data from JSON file
-with open("DATA/Kraft_topic_evolution.json") as evo_file:
-    topic_evolution_data = json.load(evo_file)
+# Open the compiled store of market insights, provocations and topic evolution once per process.
+# It is rebuilt from the JSON files only when they change.
+@st.cache_resource
+def get_store():
+    return load_store()
+
+
+store = get_store()
+
+
+# Number of background worker processes generating market insights, and how often the UI polls them
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = 2
+
+
+# Pipeline progress counters shown for each job, in pipeline order
+PROGRESS_LABELS = {
+    "prompts": "Prompts",
+    "searches": "Searches",
+    "urls_fetched": "URLs fetched",
+    "urls_scraped": "URLs scraped",
+    "configs": "Configs done",
+    "valid_results": "Valid results",
+}
+
+
+def progress_ratio(progress, key):
+    done, total = progress.get(key, (0, None))
+    return min(done / total, 1.0) if total else 0.0
+
+
+def render_job_progress(job):
+    """
+    Renders the persisted progress snapshot of a job as a progress bar and a status line.
+    """
+    progress = job["progress"]
+    if job["status"] == "running":
+        # Searching accounts for the first 30% of the bar, scraping the configs for the rest
+        st.progress(0.3 * progress_ratio(progress, "searches") + 0.7 * progress_ratio(progress, "configs"))
+    parts = []
+    for counter, label in PROGRESS_LABELS.items():
+        done, total = progress.get(counter, (0, None))
+        if total is None and not done:
+            continue
+        parts.append(f"{label}: {done}/{total}" if total is not None else f"{label}: {done}")
+    if parts:
+        st.caption(" · ".join(parts))
+
+
+@st.cache_resource
+def get_job_queue():
+    # Start the workers once per Streamlit process; they keep running across reruns and sessions
+    start_workers(JOB_WORKERS)
+    return JobQueue()
+
 
 # Initialize session state variables if not already set
 if 'insights_in_progress' not in st.session_state:
@@ -139,55 +188,63 @@ elif page_selection == "🤖 Get Insights":
                 selected_topics = st.multiselect("Select topics to run insights on", topic_list)
 
                 if len(selected_topics) > 0:
-                    st.session_state['insights_in_progress'] = True
-                    st.title("Fetching New Market Insights")
-                    progress_bar = st.progress(0)
-                    st.write("Running the scraper and processing the data...")
-
-                    steps = 5
-                    for step in range(steps):
-                        time.sleep(1)
-                        progress_bar.progress((step + 1) / steps)
-
-                    OPENAI_API_KEY = ""
-                    API_KEY = ""
+                    queue = get_job_queue()
+
+                    # Queue one background job per topic; the jobs survive reruns of this script
+                    batch_key = (uploaded_file.name, tuple(selected_topics))
+                    if st.button("Get insights"):
+                        st.session_state['insights_batch'] = queue.enqueue(selected_topics, "Food", n_urls=50)
+                        st.session_state['insights_batch_key'] = batch_key
+
+                    batch_id = st.session_state.get('insights_batch')
+                    if batch_id and st.session_state.get('insights_batch_key') == batch_key:
+                        st.title("Fetching New Market Insights")
+                        jobs = queue.batch_status(batch_id)
+                        for job in jobs:
+                            st.write(f"**{job['topic']}**: {job['status']}")
+                            render_job_progress(job)
+                            if job["status"] == "failed":
+                                st.error(job["error"])
+
+                        pending = [job for job in jobs if job["status"] in ("queued", "running")]
+                        st.session_state['insights_in_progress'] = bool(pending)
+                        if pending:
+                            # Poll the job status until every job of the batch has finished
+                            time.sleep(JOB_POLL_INTERVAL)
+                            st.rerun()
+
+                        results = []
+                        for job in jobs:
+                            transformed_data = transform_market_insights_data(queue.results(job["id"]))
+                            results.append({job["topic"]: transformed_data})
+
+                        first_letter = uploaded_file.name[0]
+                        output_filename = f"{first_letter}_generated_market_insights.json"
                     
-                    texts_df = search(API_KEY, selected_topics, "Food")
-
-                    results = []
-                    for unique_topic in selected_topics:
-                        tab = run_multiple_configs(OPENAI_API_KEY, unique_topic, texts_df, 50)
-                        transformed_data = transform_market_insights_data(tab)
-                        results.append({unique_topic: transformed_data})
-
-                    first_letter = uploaded_file.name[0]
-                    output_filename = f"{first_letter}_generated_market_insights.json"
+                        with open(output_filename, "w") as output_file:
+                            json.dump(results, output_file, indent=4)
                     
-                    with open(output_filename, "w") as output_file:
-                        json.dump(results, output_file, indent=4)
-                    
-                    st.header("📝 Generated Market Insights")
-                    for result in results:
-                        topic_name = list(result.keys())[0]
-                        insights_data = result[topic_name]
+                        st.header("📝 Generated Market Insights")
+                        for result in results:
+                            topic_name = list(result.keys())[0]
+                            insights_data = result[topic_name]
                         
-                        st.markdown(f"### **Topic: {topic_name}**")
-                        for insight in insights_data:
-                            st.markdown(
-                                f"""
-                                <div class="card">
-                                    <p class="blue-text">Estimated Growth: {insight.get('Estimated potential market growth percentage', 'N/A')}</p>
-                                    <p>Market Size: {insight.get('Estimated Market Size', 'N/A')}</p>
-                                    <p>Future Market Size: {insight.get('Future Estimated market size', 'N/A')}</p>
-                                    <p>Description: {insight.get('Description', 'N/A')}</p>
-                                    <a href="{insight.get('Source', '#')}" class="external-link" target="_blank">Source</a>
-                                </div>
-                                """, 
-                                unsafe_allow_html=True
-                            )
+                            st.markdown(f"### **Topic: {topic_name}**")
+                            for insight in insights_data:
+                                st.markdown(
+                                    f"""
+                                    <div class="card">
+                                        <p class="blue-text">Estimated Growth: {insight.get('Estimated potential market growth percentage', 'N/A')}</p>
+                                        <p>Market Size: {insight.get('Estimated Market Size', 'N/A')}</p>
+                                        <p>Future Market Size: {insight.get('Future Estimated market size', 'N/A')}</p>
+                                        <p>Description: {insight.get('Description', 'N/A')}</p>
+                                        <a href="{insight.get('Source', '#')}" class="external-link" target="_blank">Source</a>
+                                    </div>
+                                    """, 
+                                    unsafe_allow_html=True
+                                )
                     
-                    st.success(f"Market insights generation complete! File saved as `{output_filename}`.")
-                    st.session_state['insights_in_progress'] = False
+                        st.success(f"Market insights generation complete! File saved as `{output_filename}`.")
                 else:
                     st.write("Please select at least one topic to proceed.")
         except Exception as e:
@@ -202,16 +259,12 @@ elif page_selection == "📈 Market Insights" and not st.session_state['insights
     # No default topic selected
     st.subheader("Select a topic to explore the latest market insights:")
 
-    topics = list(data.keys())
+    topics = store.market_topics()
     selected_topic = st.selectbox("Pick a topic", topics, index=None)  # No default selection
 
     if selected_topic:
-        # Show progress bar for 3 seconds
-        with st.spinner("Looking for interesting insights, please wait..."):
-            time.sleep(3)  # Simulate delay
-
         st.header(f"🔍 Insights for **{selected_topic}**")
-        insights = data[selected_topic][selected_topic]
+        insights = store.market_insights(selected_topic)[selected_topic]
 
         cols_per_row = 2
 
@@ -245,16 +298,12 @@ elif page_selection == "💡 Topic Provocations":
     st.subheader("Select a topic to generate provocations:")
 
     # Extract the list of unique topics from the provocations JSON
-    topics = [item["Topic"] for item in provocations_data]
+    topics = store.provocation_topics()
     selected_topic = st.selectbox("Pick a topic", topics, index=None)  # No default selection
 
     if selected_topic:
-        # Show progress bar
-        with st.spinner("Generating provocations, please wait..."):
-            time.sleep(4)  # Simulate delay of 4 seconds
-
         # Find the provocations associated with the selected topic
-        selected_provocations = [p for p in provocations_data if p["Topic"] == selected_topic]
+        selected_provocations = store.provocations(selected_topic)
 
         # Display provocations in vertical boxes, separated by a space
         st.markdown('<div class="provocations-container">', unsafe_allow_html=True)
@@ -280,16 +329,12 @@ elif page_selection == "📉 Topic Evolution":
     st.subheader("Select a topic to explore its evolution over time:")
 
     # Extract the list of unique topics from the topic evolution JSON
-    topics = list(topic_evolution_data.keys())
+    topics = store.evolution_topics()
     selected_topic = st.selectbox("Select a topic", topics, index=None)  # No default selection
 
     if selected_topic:
-        # Show progress bar for 4 seconds
-        with st.spinner("Generating topic evolution, please wait..."):
-            time.sleep(4)  # Simulate delay
-
         # Retrieve timeline data for the selected topic
-        timeline_data = topic_evolution_data[selected_topic]
+        timeline_data = store.topic_evolution(selected_topic)
 
         # Sort the years to display in chronological order
         sorted_years = sorted(timeline_data.keys())
@@ -0,0 +1,115 @@
+"""
+Micro-benchmark of the section extraction of generated market analyses.
+
+Compares the previous row-by-row parser with the vectorised Polars parser of
+`utils.extract_sections_from_generated_texts` on synthetic generations, and checks that both agree, including on
+sections out of template order and sections missing their terminator.
+
+Usage:
+    python benchmarks/bench_sections.py --rows 20000
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import SECTIONS, extract_sections_from_generated_texts
+
+
+def synthetic_texts(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Builds generations shaped like the market analysis template output. Some sections are randomly missing, some
+    come out of template order and some lack the blank line and "###" header that close them.
+    """
+    rng = random.Random(seed)
+    words = ["market", "**growth**", "CAGR", "12.5%", "consumers", "brands", "USD", "billion", "demand", "premium"]
+    topics, texts = [], []
+    for i in range(n_rows):
+        sections = [section for section in SECTIONS if rng.random() < 0.9]
+        if rng.random() < 0.2:
+            rng.shuffle(sections)
+        text = "**Title:** Synthetic analysis\n\n**Introduction:** " + " ".join(rng.choices(words, k=40))
+        for section in sections + ["Conclusion"]:
+            bullets = "\n".join("- " + " ".join(rng.choices(words, k=rng.randint(8, 30))) for _ in range(4))
+            # A missing blank line leaves the previous section without its terminator
+            separator = " " if rng.random() < 0.1 else "\n\n"
+            text += f"{separator}### **{section}:**\n\n{bullets}"
+        topics.append(f"Topic {i % 50}")
+        texts.append(text)
+    return pd.DataFrame({"Topic": topics, "Generated_Text": texts})
+
+
+# Layouts a parser that assumes template order gets wrong
+EDGE_CASES = [
+    "### Trends:\n\nA\n\n### Key Statistics:\n\nB\n\n### End",
+    "### Key Statistics:\n\nK no end ### Trends:\n\nT\n\n### x",
+    "### Emerging Opportunities or Threats:\n\nE\n\n### Consumer Insights:\n\nC\n\n### Trends:\n\nT",
+    "No sections at all.",
+]
+
+
+def legacy_extract_sections(generated_texts_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The previous implementation: iterrows, re.sub and five uncompiled re.search calls per row.
+    """
+    def extract_sections(text):
+        cleaned_text = re.sub(r'\*\*', '', text)
+        sections = {
+            'Key Statistics': re.search(r'### Key Statistics:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
+            'Trends': re.search(r'### Trends:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
+            'Competitive Insights': re.search(r'### Competitive Insights:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
+            'Consumer Insights': re.search(r'### Consumer Insights:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
+            'Emerging Opportunities or Threats': re.search(r'### Emerging Opportunities or Threats:\n\n(.*)', cleaned_text, re.DOTALL)
+        }
+        return {section: (match.group(1).strip() if match else '') for section, match in sections.items()}
+
+    all_extracted_data = []
+    for _, row in generated_texts_df.iterrows():
+        extracted_data = extract_sections(row['Generated_Text'])
+        extracted_data['Topic'] = row['Topic']
+        all_extracted_data.append(extracted_data)
+    return pd.DataFrame(all_extracted_data)
+
+
+def best_of(function, *args, repeat: int = 3):
+    """
+    Returns the best wall time over `repeat` runs and the result of the last run.
+    """
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the section extraction of generated texts.")
+    parser.add_argument("--rows", type=int, default=20000, help="Number of synthetic generations.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per implementation; the best time is kept.")
+    args = parser.parse_args()
+
+    edge_df = pd.DataFrame({"Topic": [f"Edge {i}" for i in range(len(EDGE_CASES))], "Generated_Text": EDGE_CASES})
+    pd.testing.assert_frame_equal(legacy_extract_sections(edge_df), extract_sections_from_generated_texts(edge_df))
+
+    df = synthetic_texts(args.rows)
+    legacy_time, legacy_df = best_of(legacy_extract_sections, df, repeat=args.repeat)
+    vectorised_time, vectorised_df = best_of(extract_sections_from_generated_texts, df, repeat=args.repeat)
+
+    # Both implementations must produce the same frame
+    pd.testing.assert_frame_equal(legacy_df, vectorised_df)
+
+    print(f"Rows: {args.rows}")
+    print(f"Legacy (iterrows + re):  {legacy_time:.3f}s ({args.rows / legacy_time:,.0f} rows/s)")
+    print(f"Vectorised (Polars):     {vectorised_time:.3f}s ({args.rows / vectorised_time:,.0f} rows/s)")
+    print(f"Speed-up: {legacy_time / vectorised_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict
+
+from stores import ensure_parent_dir
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Returns a stable digest of JSON-serialisable inputs, used to detect whether a topic's inputs changed.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Append-only JSONL log of per-topic pipeline results, used to resume long runs.
+
+    Every record holds a "Topic" plus the fields produced for it by one pipeline stage; loading merges
+    the records of a topic in order, so later records override earlier ones. A line torn by a crash is
+    ignored on load.
+
+    Args:
+        path (str): Location of the JSONL file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        ensure_parent_dir(path)
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the merged record of every topic in the log.
+        """
+        records: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return records
+        with self._lock, open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records.setdefault(record["Topic"], {}).update(record)
+        return records
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Durably appends a record to the log.
+        """
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock, open(self.path, 'ab+') as file:
+            # Start on a new line if a crash left the last record torn, so this record is not lost with it
+            size = file.seek(0, os.SEEK_END)
+            if size:
+                file.seek(size - 1)
+                if file.read(1) != b'\n':
+                    line = b'\n' + line
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
@@ -0,0 +1,209 @@
+import re
+import math
+from functools import lru_cache
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+import tiktoken
+
+T = TypeVar("T")
+
+# Token budget of a chunk, leaving room for the extraction prompt and the answer in an 8k-16k context window
+DEFAULT_CHUNK_TOKENS = 3000
+DEFAULT_OVERLAP_TOKENS = 150
+
+# Terms that signal a chunk holds market figures. Multi-word terms and symbols are matched as phrases.
+RELEVANCE_TERMS = [
+    "cagr", "compound annual growth rate", "market size", "market value", "growth rate", "forecast",
+    "usd", "eur", "$", "€", "billion", "million", "%", "revenue", "valued at",
+]
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Average characters per token of English text, used when the tiktoken encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+
+
+class CharEncoding:
+    """
+    Stand-in for a tiktoken encoding that counts every CHARS_PER_TOKEN characters as one token.
+    """
+
+    def encode(self, text: str, disallowed_special=()) -> List[str]:
+        return [text[i:i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+    def decode(self, tokens: Sequence[str]) -> str:
+        return "".join(tokens)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name: str = "cl100k_base"):
+    """
+    Returns the tiktoken encoding used to measure token budgets, loaded once per process.
+
+    tiktoken downloads the encoding on first use. When it cannot be loaded, e.g. offline, token budgets are
+    estimated from the text length with a `CharEncoding` instead.
+    """
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        print(f"Could not load the {encoding_name} encoding, estimating tokens from characters: {e}")
+        return CharEncoding()
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text.
+
+    Args:
+        text (str): The text to measure.
+
+    Returns:
+        int: The number of tokens.
+    """
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def split_into_chunks(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS,
+                      overlap_tokens: int = DEFAULT_OVERLAP_TOKENS) -> List[str]:
+    """
+    Splits a document into chunks of at most `max_tokens` tokens.
+
+    Paragraphs are packed greedily so chunks break on paragraph boundaries. A paragraph longer than the budget
+    is cut into token windows that overlap by `overlap_tokens`, so a figure straddling a cut is kept whole in
+    one of them.
+
+    Args:
+        text (str): The document text.
+        max_tokens (int): Token budget of a chunk.
+        overlap_tokens (int): Tokens shared by consecutive windows of an oversized paragraph.
+
+    Returns:
+        List[str]: The chunks, in document order.
+    """
+    encoding = get_encoding()
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = encoding.encode(paragraph, disallowed_special=())
+
+        # Cut oversized paragraphs into overlapping windows
+        if len(tokens) > max_tokens:
+            if current:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            step = max(1, max_tokens - overlap_tokens)
+            for start in range(0, len(tokens), step):
+                chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+                if start + max_tokens >= len(tokens):
+                    break
+            continue
+
+        # Close the current chunk once the paragraph no longer fits
+        if current and current_tokens + len(tokens) > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(paragraph)
+        current_tokens += len(tokens)
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+@lru_cache(maxsize=None)
+def term_pattern(term: str) -> "re.Pattern":
+    """
+    Compiles the pattern matching a relevance term. Words only match whole words, so "eur" does not match "europe".
+    """
+    pattern = re.escape(term.lower())
+    if term[:1].isalnum():
+        pattern = rf"(?<!\w){pattern}(?!\w)"
+    return re.compile(pattern)
+
+
+def score_chunks(chunks: Sequence[str], terms: Sequence[str] = RELEVANCE_TERMS,
+                 k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """
+    Scores chunks against the relevance terms with BM25.
+
+    Args:
+        chunks (Sequence[str]): The chunks to score.
+        terms (Sequence[str]): The query terms, matched case-insensitively as phrases.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalisation.
+
+    Returns:
+        List[float]: The score of each chunk; 0 when it contains none of the terms.
+    """
+    if not chunks:
+        return []
+    lowered = [chunk.lower() for chunk in chunks]
+    lengths = [max(1, len(WORD_PATTERN.findall(chunk))) for chunk in lowered]
+    average_length = sum(lengths) / len(lengths)
+
+    # Term frequencies per chunk and number of chunks containing each term
+    patterns = {term: term_pattern(term) for term in terms}
+    frequencies = [
+        Counter({term: len(pattern.findall(chunk)) for term, pattern in patterns.items()}) for chunk in lowered
+    ]
+    document_frequency = Counter(term for counts in frequencies for term, count in counts.items() if count)
+
+    scores = []
+    for counts, length in zip(frequencies, lengths):
+        score = 0.0
+        for term, count in counts.items():
+            if not count:
+                continue
+            idf = math.log(1 + (len(chunks) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * count * (k1 + 1) / (count + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def select_relevant_chunks(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS, top_k: int = 4,
+                           terms: Sequence[str] = RELEVANCE_TERMS) -> List[str]:
+    """
+    Splits a document by token budget and keeps only the chunks most likely to hold market figures.
+
+    Args:
+        text (str): The document text.
+        max_tokens (int): Token budget of a chunk.
+        top_k (int): Maximum number of chunks kept.
+        terms (Sequence[str]): The relevance terms.
+
+    Returns:
+        List[str]: Up to `top_k` chunks, most relevant first. Chunks matching none of the terms are dropped,
+                   unless no chunk matches, in which case the first chunk is kept.
+    """
+    chunks = split_into_chunks(text, max_tokens)
+    scores = score_chunks(chunks, terms)
+    ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+    if not ranked:
+        return chunks[:1]
+    return [chunks[i] for i in ranked[:top_k]]
+
+
+def map_chunks(chunks: Sequence[str], extract: Callable[[str], T], max_workers: int = 4,
+               reduce: Optional[Callable[[List[T]], T]] = None):
+    """
+    Runs an extraction over chunks concurrently and optionally merges the results.
+
+    Args:
+        chunks (Sequence[str]): The chunks to process.
+        extract (Callable[[str], T]): Extraction run on each chunk.
+        max_workers (int): Maximum number of chunks processed at once.
+        reduce (Optional[Callable[[List[T]], T]]): Merges the per-chunk results, given in chunk order.
+
+    Returns:
+        The merged result when `reduce` is given, otherwise the list of per-chunk results in chunk order.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        results = list(executor.map(extract, chunks))
+    return reduce(results) if reduce else results
@@ -0,0 +1,214 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_STORE_PATH = os.environ.get('DATA_STORE_PATH', os.path.join('.cache', 'dashboard.sqlite'))
+
+# Source JSON files compiled into the store
+MARKET_INSIGHTS_PATH = "kraft_market_insigths.json"
+PROVOCATIONS_PATH = "DATA/Kraft_topics_provocations.json"
+TOPIC_EVOLUTION_PATH = "DATA/Kraft_topic_evolution.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS market_insights (
+    topic TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS provocations (
+    position INTEGER PRIMARY KEY,
+    topic TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_provocations_topic ON provocations (topic);
+CREATE TABLE IF NOT EXISTS topic_evolution (
+    topic TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+def _source_signature(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def build_store(store_path: str = DEFAULT_STORE_PATH,
+                market_insights_path: str = MARKET_INSIGHTS_PATH,
+                provocations_path: str = PROVOCATIONS_PATH,
+                topic_evolution_path: str = TOPIC_EVOLUTION_PATH) -> None:
+    """
+    Compiles the dashboard JSON files into an SQLite store indexed by topic.
+
+    Args:
+        store_path (str): Location of the SQLite file to (re)build.
+        market_insights_path (str): JSON mapping each topic to its market insights.
+        provocations_path (str): JSON list of {"Topic", "Attributed Themes", "Provocations"} records.
+        topic_evolution_path (str): JSON mapping each topic to its {year: text} timeline.
+    """
+    directory = os.path.dirname(store_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Build into a temporary file and swap it in, so readers never see a half-built store
+    tmp_path = f"{store_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+
+        sources = {
+            "market_insights": market_insights_path,
+            "provocations": provocations_path,
+            "topic_evolution": topic_evolution_path,
+        }
+        for name, path in sources.items():
+            signature = _source_signature(path)
+            if signature is None:
+                continue
+            conn.execute(
+                "INSERT INTO sources (name, path, mtime, size) VALUES (?, ?, ?, ?)",
+                (name, path, signature["mtime"], signature["size"]),
+            )
+
+        if os.path.exists(market_insights_path):
+            with open(market_insights_path) as f:
+                market_insights = json.load(f)
+            conn.executemany(
+                "INSERT INTO market_insights (topic, position, payload) VALUES (?, ?, ?)",
+                [(topic, i, json.dumps(payload)) for i, (topic, payload) in enumerate(market_insights.items())],
+            )
+
+        if os.path.exists(provocations_path):
+            with open(provocations_path) as f:
+                provocations = json.load(f)
+            conn.executemany(
+                "INSERT INTO provocations (position, topic, payload) VALUES (?, ?, ?)",
+                [(i, item["Topic"], json.dumps(item)) for i, item in enumerate(provocations)],
+            )
+
+        if os.path.exists(topic_evolution_path):
+            with open(topic_evolution_path) as f:
+                topic_evolution = json.load(f)
+            conn.executemany(
+                "INSERT INTO topic_evolution (topic, position, payload) VALUES (?, ?, ?)",
+                [(topic, i, json.dumps(payload)) for i, (topic, payload) in enumerate(topic_evolution.items())],
+            )
+
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, store_path)
+
+
+def is_store_stale(store_path: str = DEFAULT_STORE_PATH,
+                   market_insights_path: str = MARKET_INSIGHTS_PATH,
+                   provocations_path: str = PROVOCATIONS_PATH,
+                   topic_evolution_path: str = TOPIC_EVOLUTION_PATH) -> bool:
+    """
+    Checks whether the store is missing or was built from different versions of the JSON files.
+    """
+    if not os.path.exists(store_path):
+        return True
+
+    expected = {
+        "market_insights": (market_insights_path, _source_signature(market_insights_path)),
+        "provocations": (provocations_path, _source_signature(provocations_path)),
+        "topic_evolution": (topic_evolution_path, _source_signature(topic_evolution_path)),
+    }
+    try:
+        conn = sqlite3.connect(store_path)
+        try:
+            recorded = {
+                name: (path, {"mtime": mtime, "size": size})
+                for name, path, mtime, size in conn.execute("SELECT name, path, mtime, size FROM sources")
+            }
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return True
+
+    for name, (path, signature) in expected.items():
+        if signature is None:
+            if name in recorded:
+                return True
+        elif recorded.get(name) != (path, signature):
+            return True
+    return False
+
+
+class InsightsStore:
+    """
+    Read-only access to the compiled dashboard store with per-topic lookups through the topic index.
+
+    Args:
+        store_path (str): Location of the SQLite file built by `build_store`.
+    """
+
+    def __init__(self, store_path: str = DEFAULT_STORE_PATH):
+        self.store_path = store_path
+        self._conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def market_topics(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT topic FROM market_insights ORDER BY position")]
+
+    def market_insights(self, topic: str) -> Optional[Dict[str, Any]]:
+        rows = self._query("SELECT payload FROM market_insights WHERE topic = ?", (topic,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def provocation_topics(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT topic FROM provocations ORDER BY position")]
+
+    def provocations(self, topic: str) -> List[Dict[str, Any]]:
+        rows = self._query("SELECT payload FROM provocations WHERE topic = ? ORDER BY position", (topic,))
+        return [json.loads(row[0]) for row in rows]
+
+    def evolution_topics(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT topic FROM topic_evolution ORDER BY position")]
+
+    def topic_evolution(self, topic: str) -> Optional[Dict[str, str]]:
+        rows = self._query("SELECT payload FROM topic_evolution WHERE topic = ?", (topic,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def load_store(store_path: str = DEFAULT_STORE_PATH) -> InsightsStore:
+    """
+    Opens the dashboard store, (re)building it first if the JSON files changed since it was compiled.
+
+    Args:
+        store_path (str): Location of the SQLite file.
+
+    Returns:
+        InsightsStore: The opened store.
+    """
+    if is_store_stale(store_path):
+        build_store(store_path)
+    return InsightsStore(store_path)
+
+
+if __name__ == "__main__":
+    build_store()
+    print(f"Store compiled to {DEFAULT_STORE_PATH}")
@@ -0,0 +1,326 @@
+import os
+import json
+import atexit
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+import traceback
+import multiprocessing
+from contextlib import closing
+from typing import Any, Callable, Dict, List, Optional
+
+from progress import ProgressReporter
+from stores import connect
+
+DEFAULT_JOBS_PATH = os.environ.get('JOBS_DB_PATH', os.path.join('.cache', 'jobs.sqlite'))
+
+# Running jobs send a heartbeat every HEARTBEAT_SECONDS, on top of their progress snapshots, so a long scrape that
+# reports nothing is not mistaken for a crash. Jobs whose worker missed several heartbeats are considered abandoned
+# and re-queued.
+HEARTBEAT_SECONDS = 30
+STALE_JOB_SECONDS = 10 * HEARTBEAT_SECONDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    n_urls INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    error TEXT,
+    progress TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id INTEGER NOT NULL,
+    config_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (job_id, config_type)
+);
+"""
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of insight generation jobs, one job per topic.
+
+    Jobs move from "queued" to "running" when a worker claims them and end as "done" or "failed".
+    Workers persist the results of each prompt config as soon as it resolves, so a restarted job only
+    redoes the configs that were not finished.
+
+    Args:
+        path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOBS_PATH):
+        self.path = path
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return connect(self.path, isolation_level=None)
+
+    def enqueue(self, topics: List[str], domain: str, n_urls: int = 50) -> str:
+        """
+        Queues one job per topic and returns the id of the batch.
+        """
+        batch_id = uuid.uuid4().hex
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.executemany(
+                "INSERT INTO jobs (batch_id, topic, domain, n_urls, status, created_at, updated_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+                [(batch_id, topic, domain, n_urls, now, now) for topic in topics],
+            )
+        return batch_id
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """
+        Atomically moves the oldest queued job to "running" for a worker and returns it, or None if the queue is empty.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                (worker, now, now, row["id"]),
+            )
+            conn.execute("COMMIT")
+            job = dict(row)
+            job.update(status="running", worker=worker, started_at=now, updated_at=now)
+            return job
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def save_partial(self, job_id: int, config_type: str, results: List[Dict[str, Any]]) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, config_type, payload) VALUES (?, ?, ?)",
+                (job_id, config_type, json.dumps(results)),
+            )
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def update_progress(self, job_id: int, progress: Dict[str, Any]) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(progress), time.time(), job_id),
+            )
+
+    def heartbeat(self, job_id: int) -> None:
+        """
+        Marks a running job as alive without changing its progress.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+
+    def complete(self, job_id: int) -> None:
+        self._finish(job_id, "done", None)
+
+    def fail(self, job_id: int, error: str) -> None:
+        self._finish(job_id, "failed", error)
+
+    def _finish(self, job_id: int, status: str, error: Optional[str]) -> None:
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, updated_at = ? WHERE id = ?",
+                (status, error, now, now, job_id),
+            )
+
+    def requeue_stale(self, max_age: float = STALE_JOB_SECONDS) -> int:
+        """
+        Puts back running jobs whose worker stopped sending heartbeats and progress, e.g. after a crash. Returns how
+        many were re-queued.
+        """
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND updated_at < ?",
+                (time.time() - max_age,),
+            )
+        return cursor.rowcount
+
+    def completed_configs(self, job_id: int) -> Dict[str, List[Dict[str, Any]]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT config_type, payload FROM job_results WHERE job_id = ?", (job_id,)).fetchall()
+        return {row["config_type"]: json.loads(row["payload"]) for row in rows}
+
+    def results(self, job_id: int) -> List[Dict[str, Any]]:
+        """
+        Returns the scraper results persisted for a job so far.
+        """
+        return [result for results in self.completed_configs(job_id).values() for result in results]
+
+    def batch_status(self, batch_id: str) -> List[Dict[str, Any]]:
+        """
+        Returns the jobs of a batch with their status and latest progress snapshot.
+        """
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE batch_id = ? ORDER BY id", (batch_id,)).fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(row)
+            job["progress"] = json.loads(job["progress"]) if job["progress"] else {}
+            jobs.append(job)
+        return jobs
+
+
+class JobProgress(ProgressReporter):
+    """
+    Persists the pipeline progress counters of a job, at most once per `interval` seconds.
+    """
+
+    def __init__(self, queue: JobQueue, job_id: int, interval: float = 1.0):
+        super().__init__()
+        self.queue = queue
+        self.job_id = job_id
+        self.interval = interval
+        self._last_write = 0.0
+
+    def on_update(self, key: str) -> None:
+        now = time.time()
+        if now - self._last_write < self.interval and key != "configs":
+            return
+        self._last_write = now
+        self.queue.update_progress(self.job_id, self.snapshot())
+
+
+def run_job(queue: JobQueue, job: Dict[str, Any]) -> None:
+    """
+    Generates the market insights of a job's topic, persisting each prompt config as it resolves.
+
+    The API keys are read from the OPENAI_API_KEY and SERPAPI_API_KEY environment variables.
+    """
+    # Imported here so the queue can be used without loading the scraping stack
+    from open_ai_market_insigth import search, run_configs_concurrently, PROMPT_CONFIGS
+
+    openai_api_key = os.environ.get("OPENAI_API_KEY", "")
+    serpapi_api_key = os.environ.get("SERPAPI_API_KEY", "")
+
+    # Skip the configs finished by a previous attempt of this job
+    done_configs = queue.completed_configs(job["id"])
+    configs = [config for config in PROMPT_CONFIGS if config["type"] not in done_configs]
+    if not configs:
+        return
+
+    progress = JobProgress(queue, job["id"])
+    texts_df = search(serpapi_api_key, [job["topic"]], job["domain"], progress=progress)
+    for _, config, results in run_configs_concurrently(openai_api_key, [job["topic"]], texts_df, job["n_urls"],
+                                                       configs=configs, progress=progress):
+        queue.save_partial(job["id"], config["type"], results)
+
+
+def send_heartbeats(queue: JobQueue, job_id: int, stop: threading.Event,
+                    interval: float = HEARTBEAT_SECONDS) -> None:
+    """
+    Sends a heartbeat for a job every `interval` seconds until `stop` is set.
+    """
+    while not stop.wait(interval):
+        try:
+            queue.heartbeat(job_id)
+        except sqlite3.Error as e:
+            print(f"Heartbeat of job {job_id} failed: {e}")
+
+
+def worker_loop(path: str = DEFAULT_JOBS_PATH, poll_interval: float = 2.0, max_jobs: Optional[int] = None,
+                job_runner: Callable[[JobQueue, Dict[str, Any]], None] = run_job) -> None:
+    """
+    Claims and runs jobs until `max_jobs` were processed, or forever if None.
+
+    Args:
+        path (str): Location of the jobs SQLite file.
+        poll_interval (float): Seconds waited before polling an empty queue again.
+        max_jobs (Optional[int]): Number of jobs processed before returning.
+        job_runner (Callable[[JobQueue, Dict[str, Any]], None]): Runs a claimed job, `run_job` by default.
+    """
+    queue = JobQueue(path)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    while max_jobs is None or processed < max_jobs:
+        queue.requeue_stale()
+        job = queue.claim(worker)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        print(f"[{worker}] Running job {job['id']} for topic: {job['topic']}")
+        # Keep the job alive while it runs, so only jobs of dead workers are re-queued
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=send_heartbeats, args=(queue, job["id"], stop))
+        heartbeat.start()
+        try:
+            job_runner(queue, job)
+            queue.complete(job["id"])
+        except Exception:
+            queue.fail(job["id"], traceback.format_exc())
+        finally:
+            stop.set()
+            heartbeat.join()
+        processed += 1
+
+
+def start_workers(n_workers: int = 2, path: str = DEFAULT_JOBS_PATH, max_jobs: Optional[int] = None,
+                  job_runner: Callable[[JobQueue, Dict[str, Any]], None] = run_job) -> List[multiprocessing.Process]:
+    """
+    Starts `n_workers` worker processes consuming the queue.
+
+    Jobs start process pools of their own to parse pages (see `scraping.fetch_documents`), which daemonic processes
+    are not allowed to do, so the workers are regular processes. They are stopped when the starting process exits;
+    a job interrupted that way is re-queued once it is stale.
+
+    Args:
+        n_workers (int): Number of worker processes.
+        path (str): Location of the jobs SQLite file.
+        max_jobs (Optional[int]): Number of jobs each worker processes before exiting, forever if None.
+        job_runner (Callable[[JobQueue, Dict[str, Any]], None]): Runs a claimed job, `run_job` by default. It must
+                                                                 be importable by the spawned workers.
+
+    Returns:
+        List[multiprocessing.Process]: The started workers.
+    """
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    for _ in range(n_workers):
+        process = context.Process(target=worker_loop, args=(path,),
+                                  kwargs={"max_jobs": max_jobs, "job_runner": job_runner})
+        process.start()
+        processes.append(process)
+    atexit.register(stop_workers, processes)
+    return processes
+
+
+def stop_workers(processes: List[multiprocessing.Process], timeout: float = 5.0) -> None:
+    """
+    Terminates the worker processes that are still running and waits for them to exit.
+    """
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run market insight job workers.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of worker processes.")
+    parser.add_argument("--db", default=DEFAULT_JOBS_PATH, help="Path of the jobs SQLite file.")
+    args = parser.parse_args()
+
+    for process in start_workers(args.workers, args.db):
+        process.join()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import httpx
+
+from ollama.client import BASE_URL, DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT
+from ollama.cache import get_default_cache
+
+
+class AsyncClient:
+    """
+    asyncio counterpart of `ollama.client.Client` for issuing many generations concurrently.
+
+    Generations never print; the streamed chunks are accumulated and returned once the final chunk
+    arrives. Use `generate_many` to keep the server's parallel slots busy while preserving input order.
+
+    Args:
+        base_url (str): The Ollama server URL. Defaults to the OLLAMA_HOST environment variable.
+        pool_size (int): Maximum number of pooled connections kept alive to the server.
+        connect_timeout (float): Seconds to wait when establishing a connection.
+        read_timeout (float): Seconds to wait between bytes of a response.
+    """
+
+    def __init__(self, base_url=None, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.base_url = (base_url or BASE_URL).rstrip('/')
+        self.http = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    # Generate a response for a given prompt with a provided model. Returns the full response and the final context,
+    # or (None, None) if the request failed. The optional callback receives every JSON chunk as it is streamed.
+    async def generate(self, model_name, prompt, system=None, template=None, context=None, options=None, callback=None):
+        try:
+            payload = {
+                "model": model_name,
+                "prompt": prompt,
+                "system": system,
+                "template": template,
+                "context": context,
+                "options": options
+            }
+
+            # Remove keys with None values
+            payload = {k: v for k, v in payload.items() if v is not None}
+
+            pieces = []
+            final_context = None
+            async with self.http.stream("POST", f"{self.base_url}/api/generate", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if callback:
+                        callback(chunk)
+                    if chunk.get("done"):
+                        final_context = chunk.get("context")
+                    else:
+                        pieces.append(chunk.get("response", ""))
+
+            return "".join(pieces), final_context
+        except httpx.HTTPError as e:
+            print(f"An error occurred: {e}")
+            return None, None
+
+    async def generate_many(self, prompts, model_name, max_concurrency=4, system=None, options=None, on_result=None):
+        """
+        Generates a response for every prompt with at most `max_concurrency` requests in flight.
+
+        Args:
+            prompts (List[str]): The prompts to generate responses for.
+            model_name (str): The model to be used for text generation.
+            max_concurrency (int): Maximum number of concurrent requests sent to the server.
+            system (str): Optional system prompt shared by every request.
+            options (dict): Optional model options shared by every request.
+            on_result (Callable[[int, Optional[str]], None]): Optional callback invoked with the index and response
+                                                              of each prompt as soon as it completes.
+
+        Returns:
+            List[Optional[str]]: The generated texts, in the same order as `prompts`. Failed requests yield None.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(index, prompt):
+            async with semaphore:
+                response, _ = await self.generate(model_name, prompt, system=system, options=options)
+            if on_result:
+                on_result(index, response)
+            return response
+
+        return await asyncio.gather(*(run(i, prompt) for i, prompt in enumerate(prompts)))
+
+
+def generate_many(prompts, model, max_concurrency=4, system=None, options=None, use_cache=True, on_result=None):
+    """
+    Synchronous entry point for batch generation, for use from Polars/pandas pipelines.
+
+    Args:
+        prompts (List[str]): The prompts to generate responses for.
+        model (str): The model to be used for text generation.
+        max_concurrency (int): Maximum number of concurrent requests sent to the server.
+        system (str): Optional system prompt shared by every request.
+        options (dict): Optional model options shared by every request.
+        use_cache (bool): Serve repeated prompts from the generation cache. Disable for calls that
+                          intentionally sample several answers to the same prompt.
+        on_result (Callable[[int, Optional[str]], None]): Optional callback invoked with the index and response
+                                                          of each prompt as soon as it is available, e.g. to checkpoint
+                                                          progress. Cached prompts are reported first.
+
+    Returns:
+        List[Optional[str]]: The generated texts, in the same order as `prompts`.
+    """
+    cache = get_default_cache() if use_cache else None
+    responses = [None] * len(prompts)
+
+    # Only send the prompts that are not already cached
+    pending = []
+    for i, prompt in enumerate(prompts):
+        cached = cache.get(model, prompt, options, system) if cache else None
+        if cached is not None:
+            responses[i] = cached
+            if on_result:
+                on_result(i, cached)
+        else:
+            pending.append(i)
+
+    def store(pending_index, response):
+        # Cache and report each response as soon as it arrives, so an interrupted batch keeps its progress
+        i = pending[pending_index]
+        responses[i] = response
+        if cache:
+            cache.set(model, prompts[i], response, options, system)
+        if on_result:
+            on_result(i, response)
+
+    async def run():
+        async with AsyncClient(pool_size=max_concurrency) as async_client:
+            await async_client.generate_many([prompts[i] for i in pending], model,
+                                             max_concurrency=max_concurrency,
+                                             system=system, options=options, on_result=store)
+
+    if pending:
+        asyncio.run(run())
+
+    return responses
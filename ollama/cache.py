@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+
+from stores import connect, process_singleton
+
+DEFAULT_CACHE_PATH = os.environ.get('OLLAMA_CACHE_PATH', os.path.join('.cache', 'generations.sqlite'))
+DEFAULT_MAX_BYTES = int(os.environ.get('OLLAMA_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+DEFAULT_EMBEDDING_CACHE_PATH = os.environ.get('OLLAMA_EMBEDDING_CACHE_PATH', os.path.join('.cache', 'embeddings.sqlite'))
+
+# Set OLLAMA_CACHE_DISABLED=1 to bypass the cache for every call in the process.
+CACHE_DISABLED = os.environ.get('OLLAMA_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+
+
+def cache_key(model, prompt, options=None, system=None):
+    """
+    Returns the content address of a generation request.
+
+    Args:
+        model (str): The model name.
+        prompt (str): The prompt text.
+        options (dict): Optional model options.
+        system (str): Optional system prompt.
+
+    Returns:
+        str: A SHA-256 hex digest identifying the request.
+    """
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "options": options, "system": system},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """
+    Content-addressed SQLite store of LLM generations with size-bounded LRU eviction.
+
+    Entries are keyed on (model, prompt, options, system). Every read refreshes the entry's access time,
+    and once the stored responses exceed `max_bytes` the least recently used entries are evicted.
+
+    Args:
+        path (str): Location of the SQLite file.
+        max_bytes (int): Upper bound on the total size of the cached responses.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_last_access ON generations (last_access)")
+        self._conn.commit()
+
+    def get(self, model, prompt, options=None, system=None):
+        """
+        Returns the cached response for a request, or None on a miss.
+        """
+        key = cache_key(model, prompt, options, system)
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE generations SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return row[0]
+
+    def set(self, model, prompt, response, options=None, system=None):
+        """
+        Stores a response for a request and evicts least recently used entries beyond the size bound.
+        """
+        if response is None:
+            return
+        key = cache_key(model, prompt, options, system)
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generations (key, model, response, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, size, time.time()),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Walk entries from the least recently used and drop them until the cache fits again
+        to_delete = []
+        for key, size in self._conn.execute("SELECT key, size FROM generations ORDER BY last_access ASC"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM generations WHERE key = ?", to_delete)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM generations")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingCache:
+    """
+    SQLite store of text embeddings keyed on (model, text).
+
+    Vectors are stored as float32 blobs. Embeddings are small and deterministic, so entries are never evicted.
+
+    Args:
+        path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, path=DEFAULT_EMBEDDING_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, model, texts):
+        """
+        Returns the cached embeddings of `texts`, as a dict of text -> float32 vector. Misses are left out.
+        """
+        keys = {cache_key(model, text): text for text in texts}
+        key_list = list(keys)
+        found = {}
+        with self._lock:
+            # Look keys up in chunks to stay below SQLite's bound on query parameters
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                for key, vector in self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                ):
+                    found[keys[key]] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def set_many(self, model, embeddings):
+        """
+        Stores a dict of text -> embedding.
+        """
+        rows = [
+            (cache_key(model, text), model, np.asarray(vector, dtype=np.float32).tobytes())
+            for text, vector in embeddings.items()
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_generation_cache = process_singleton(GenerationCache)
+_embedding_cache = process_singleton(EmbeddingCache)
+
+
+def get_default_cache():
+    """
+    Returns the process-wide GenerationCache, or None when caching is disabled via OLLAMA_CACHE_DISABLED.
+    """
+    return None if CACHE_DISABLED else _generation_cache()
+
+
+def get_default_embedding_cache():
+    """
+    Returns the process-wide EmbeddingCache, or None when caching is disabled via OLLAMA_CACHE_DISABLED.
+    """
+    return None if CACHE_DISABLED else _embedding_cache()
@@ -1,224 +1,317 @@
 import os
 import json
 import requests
+from requests.adapters import HTTPAdapter
 
 BASE_URL = os.environ.get('OLLAMA_HOST', 'http://localhost:11434')
 
-# Generate a response for a given prompt with a provided model. This is a streaming endpoint, so will be a series of responses.
-# The final response object will include statistics and additional data from the request. Use the callback function to override
-# the default handler.
-def generate(model_name, prompt, system=None, template=None, context=None, options=None, callback=None):
-    try:
-        url = f"{BASE_URL}/api/generate"
+# Default pool size and timeouts for the shared session. Generation can take minutes on a busy server,
+# so the read timeout is generous while the connect timeout stays short to fail fast when Ollama is down.
+DEFAULT_POOL_SIZE = int(os.environ.get('OLLAMA_POOL_SIZE', 10))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get('OLLAMA_CONNECT_TIMEOUT', 5))
+DEFAULT_READ_TIMEOUT = float(os.environ.get('OLLAMA_READ_TIMEOUT', 600))
+
+
+class Client:
+    """
+    Ollama API client backed by a pooled, keep-alive HTTP session.
+
+    A single instance reuses TCP connections to the Ollama server across calls, so batch jobs that
+    generate thousands of prompts do not pay connection setup on every request. The session is safe
+    to share between threads for the request patterns used here.
+
+    Args:
+        base_url (str): The Ollama server URL. Defaults to the OLLAMA_HOST environment variable.
+        pool_size (int): Maximum number of pooled connections kept alive to the server.
+        connect_timeout (float): Seconds to wait when establishing a connection.
+        read_timeout (float): Seconds to wait between bytes of a response.
+    """
+
+    def __init__(self, base_url=None, pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT):
+        self.base_url = (base_url or BASE_URL).rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Stream the JSON chunks of a generation as they arrive. Iterating yields each chunk dict, including the final
+    # one (done is true) that carries the context and statistics. Request errors are raised to the caller.
+    def generate_stream(self, model_name, prompt, system=None, template=None, context=None, options=None):
+        url = f"{self.base_url}/api/generate"
         payload = {
-            "model": model_name, 
-            "prompt": prompt, 
-            "system": system, 
-            "template": template, 
-            "context": context, 
+            "model": model_name,
+            "prompt": prompt,
+            "system": system,
+            "template": template,
+            "context": context,
             "options": options
         }
-        
+
         # Remove keys with None values
         payload = {k: v for k, v in payload.items() if v is not None}
-        
-        with requests.post(url, json=payload, stream=True) as response:
+
+        with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as response:
             response.raise_for_status()
-            
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    # Generate a response for a given prompt with a provided model. This is a streaming endpoint, so will be a series of responses.
+    # The final response object will include statistics and additional data from the request. Use the callback function to override
+    # the default handler. Set echo to False to accumulate the response silently instead of printing every token.
+    def generate(self, model_name, prompt, system=None, template=None, context=None, options=None, callback=None, echo=True):
+        try:
             # Creating a variable to hold the context history of the final chunk
             final_context = None
-            
-            # Variable to hold concatenated response strings if no callback is provided
-            full_response = ""
 
-            # Iterating over the response line by line and displaying the details
-            for line in response.iter_lines():
-                if line:
-                    # Parsing each line (JSON chunk) and extracting the details
-                    chunk = json.loads(line)
-                    
-                    # If a callback function is provided, call it with the chunk
-                    if callback:
-                        callback(chunk)
-                    else:
-                        # If this is not the last chunk, add the "response" field value to full_response and print it
-                        if not chunk.get("done"):
-                            response_piece = chunk.get("response", "")
-                            full_response += response_piece
-                            print(response_piece, end="", flush=True)
-                    
-                    # Check if it's the last chunk (done is true)
-                    if chunk.get("done"):
-                        final_context = chunk.get("context")
-            
+            # Response pieces, joined once at the end if no callback is provided
+            pieces = []
+
+            for chunk in self.generate_stream(model_name, prompt, system=system, template=template,
+                                              context=context, options=options):
+                # If a callback function is provided, call it with the chunk
+                if callback:
+                    callback(chunk)
+                elif not chunk.get("done"):
+                    # If this is not the last chunk, keep the "response" field value and optionally print it
+                    response_piece = chunk.get("response", "")
+                    pieces.append(response_piece)
+                    if echo:
+                        print(response_piece, end="", flush=True)
+
+                # Check if it's the last chunk (done is true)
+                if chunk.get("done"):
+                    final_context = chunk.get("context")
+
             # Return the full response and the final context
-            return full_response, final_context
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-        return None, None
+            return "".join(pieces), final_context
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return None, None
 
-# Create a model from a Modelfile. Use the callback function to override the default handler.
-def create(model_name, model_path, callback=None):
-    try:
-        url = f"{BASE_URL}/api/create"
-        payload = {"name": model_name, "path": model_path}
-        
-        # Making a POST request with the stream parameter set to True to handle streaming responses
-        with requests.post(url, json=payload, stream=True) as response:
+    # Create a model from a Modelfile. Use the callback function to override the default handler.
+    def create(self, model_name, model_path, callback=None):
+        try:
+            url = f"{self.base_url}/api/create"
+            payload = {"name": model_name, "path": model_path}
+
+            # Making a POST request with the stream parameter set to True to handle streaming responses
+            with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+
+                # Iterating over the response line by line and displaying the status
+                for line in response.iter_lines():
+                    if line:
+                        # Parsing each line (JSON chunk) and extracting the status
+                        chunk = json.loads(line)
+
+                        if callback:
+                            callback(chunk)
+                        else:
+                            print(f"Status: {chunk.get('status')}")
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+
+    # Pull a model from a the model registry. Cancelled pulls are resumed from where they left off, and multiple
+    # calls to will share the same download progress. Use the callback function to override the default handler.
+    def pull(self, model_name, insecure=False, callback=None):
+        self._stream_registry("pull", model_name, insecure, callback)
+
+    # Push a model to the model registry. Use the callback function to override the default handler.
+    def push(self, model_name, insecure=False, callback=None):
+        self._stream_registry("push", model_name, insecure, callback)
+
+    def _stream_registry(self, endpoint, model_name, insecure, callback):
+        try:
+            url = f"{self.base_url}/api/{endpoint}"
+            payload = {
+                "name": model_name,
+                "insecure": insecure
+            }
+
+            # Making a POST request with the stream parameter set to True to handle streaming responses
+            with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+
+                # Iterating over the response line by line and displaying the details
+                for line in response.iter_lines():
+                    if line:
+                        # Parsing each line (JSON chunk) and extracting the details
+                        chunk = json.loads(line)
+
+                        # If a callback function is provided, call it with the chunk
+                        if callback:
+                            callback(chunk)
+                        else:
+                            # Print the status message directly to the console
+                            print(chunk.get('status', ''), end='', flush=True)
+
+                        # If there's layer data, you might also want to print that (adjust as necessary)
+                        if 'digest' in chunk:
+                            print(f" - Digest: {chunk['digest']}", end='', flush=True)
+                            print(f" - Total: {chunk['total']}", end='', flush=True)
+                            print(f" - Completed: {chunk['completed']}", end='\n', flush=True)
+                        else:
+                            print()
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+
+    # List models that are available locally.
+    def list(self):
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
             response.raise_for_status()
+            data = response.json()
+            models = data.get('models', [])
+            return models
 
-            # Iterating over the response line by line and displaying the status
-            for line in response.iter_lines():
-                if line:
-                    # Parsing each line (JSON chunk) and extracting the status
-                    chunk = json.loads(line)
-
-                    if callback:
-                        callback(chunk)
-                    else:
-                        print(f"Status: {chunk.get('status')}")
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-
-# Pull a model from a the model registry. Cancelled pulls are resumed from where they left off, and multiple
-# calls to will share the same download progress. Use the callback function to override the default handler.
-def pull(model_name, insecure=False, callback=None):
-    try:
-        url = f"{BASE_URL}/api/pull"
-        payload = {
-            "name": model_name,
-            "insecure": insecure
-        }
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return None
 
-        # Making a POST request with the stream parameter set to True to handle streaming responses
-        with requests.post(url, json=payload, stream=True) as response:
+    # Copy a model. Creates a model with another name from an existing model.
+    def copy(self, source, destination):
+        try:
+            # Create the JSON payload
+            payload = {
+                "source": source,
+                "destination": destination
+            }
+
+            response = self.session.post(f"{self.base_url}/api/copy", json=payload, timeout=self.timeout)
             response.raise_for_status()
 
-            # Iterating over the response line by line and displaying the details
-            for line in response.iter_lines():
-                if line:
-                    # Parsing each line (JSON chunk) and extracting the details
-                    chunk = json.loads(line)
-
-                    # If a callback function is provided, call it with the chunk
-                    if callback:
-                        callback(chunk)
-                    else:
-                        # Print the status message directly to the console
-                        print(chunk.get('status', ''), end='', flush=True)
-                    
-                    # If there's layer data, you might also want to print that (adjust as necessary)
-                    if 'digest' in chunk:
-                        print(f" - Digest: {chunk['digest']}", end='', flush=True)
-                        print(f" - Total: {chunk['total']}", end='', flush=True)
-                        print(f" - Completed: {chunk['completed']}", end='\n', flush=True)
-                    else:
-                        print()
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-
-# Push a model to the model registry. Use the callback function to override the default handler.
-def push(model_name, insecure=False, callback=None):
-    try:
-        url = f"{BASE_URL}/api/push"
-        payload = {
-            "name": model_name,
-            "insecure": insecure
-        }
+            # If the request was successful, return a message indicating that the copy was successful
+            return "Copy successful"
+
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return None
 
-        # Making a POST request with the stream parameter set to True to handle streaming responses
-        with requests.post(url, json=payload, stream=True) as response:
+    # Delete a model and its data.
+    def delete(self, model_name):
+        try:
+            url = f"{self.base_url}/api/delete"
+            payload = {"name": model_name}
+            response = self.session.delete(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
+            return "Delete successful"
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    # Show info about a model.
+    def show(self, model_name):
+        try:
+            url = f"{self.base_url}/api/show"
+            payload = {"name": model_name}
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+
+            # Parse the JSON response and return it
+            data = response.json()
+            return data
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    # Embed a text with a provided model. Returns the embedding as a list of floats, or None if the request failed.
+    def embeddings(self, model_name, prompt):
+        try:
+            url = f"{self.base_url}/api/embeddings"
+            payload = {"model": model_name, "prompt": prompt}
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json().get("embedding")
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return None
+
+    def heartbeat(self):
+        try:
+            url = f"{self.base_url}/"
+            response = self.session.head(url, timeout=self.timeout)
+            response.raise_for_status()
+            return "Ollama is running"
+        except requests.exceptions.RequestException as e:
+            print(f"An error occurred: {e}")
+            return "Ollama is not running"
+
+
+# Shared client used by the module-level functions below, so every caller in the process reuses one connection pool.
+_default_client = None
+
+
+def get_client():
+    """
+    Returns the process-wide default Client, creating it on first use.
+    """
+    global _default_client
+    if _default_client is None:
+        _default_client = Client()
+    return _default_client
+
+
+def set_client(new_client):
+    """
+    Replaces the process-wide default Client, e.g. to change pool size or timeouts for a batch job.
+    """
+    global _default_client
+    if _default_client is not None and _default_client is not new_client:
+        _default_client.close()
+    _default_client = new_client
+
+
+def generate(model_name, prompt, system=None, template=None, context=None, options=None, callback=None, echo=True):
+    return get_client().generate(model_name, prompt, system=system, template=template, context=context,
+                                 options=options, callback=callback, echo=echo)
+
+def generate_stream(model_name, prompt, system=None, template=None, context=None, options=None):
+    return get_client().generate_stream(model_name, prompt, system=system, template=template, context=context,
+                                        options=options)
+
+def generate_text_stream(model_name, prompt, system=None, template=None, context=None, options=None):
+    """
+    Yields only the generated text pieces of a generation, without printing them.
+    """
+    for chunk in generate_stream(model_name, prompt, system=system, template=template, context=context, options=options):
+        if not chunk.get("done"):
+            yield chunk.get("response", "")
+
+def create(model_name, model_path, callback=None):
+    return get_client().create(model_name, model_path, callback=callback)
+
+def pull(model_name, insecure=False, callback=None):
+    return get_client().pull(model_name, insecure=insecure, callback=callback)
+
+def push(model_name, insecure=False, callback=None):
+    return get_client().push(model_name, insecure=insecure, callback=callback)
 
-            # Iterating over the response line by line and displaying the details
-            for line in response.iter_lines():
-                if line:
-                    # Parsing each line (JSON chunk) and extracting the details
-                    chunk = json.loads(line)
-
-                    # If a callback function is provided, call it with the chunk
-                    if callback:
-                        callback(chunk)
-                    else:
-                        # Print the status message directly to the console
-                        print(chunk.get('status', ''), end='', flush=True)
-                    
-                    # If there's layer data, you might also want to print that (adjust as necessary)
-                    if 'digest' in chunk:
-                        print(f" - Digest: {chunk['digest']}", end='', flush=True)
-                        print(f" - Total: {chunk['total']}", end='', flush=True)
-                        print(f" - Completed: {chunk['completed']}", end='\n', flush=True)
-                    else:
-                        print()
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-
-# List models that are available locally.
 def list():
-    try:
-        response = requests.get(f"{BASE_URL}/api/tags")
-        response.raise_for_status()
-        data = response.json()
-        models = data.get('models', [])
-        return models
-
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-        return None
-
-# Copy a model. Creates a model with another name from an existing model.
+    return get_client().list()
+
 def copy(source, destination):
-    try:
-        # Create the JSON payload
-        payload = {
-            "source": source,
-            "destination": destination
-        }
-        
-        response = requests.post(f"{BASE_URL}/api/copy", json=payload)
-        response.raise_for_status()
-        
-        # If the request was successful, return a message indicating that the copy was successful
-        return "Copy successful"
-
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-        return None
-
-# Delete a model and its data.
+    return get_client().copy(source, destination)
+
 def delete(model_name):
-    try:
-        url = f"{BASE_URL}/api/delete"
-        payload = {"name": model_name}
-        response = requests.delete(url, json=payload)
-        response.raise_for_status()
-        return "Delete successful"
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-        return None
-
-# Show info about a model.
+    return get_client().delete(model_name)
+
 def show(model_name):
-    try:
-        url = f"{BASE_URL}/api/show"
-        payload = {"name": model_name}
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        
-        # Parse the JSON response and return it
-        data = response.json()
-        return data
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-        return None
+    return get_client().show(model_name)
 
-def heartbeat():
-    try:
-        url = f"{BASE_URL}/"
-        response = requests.head(url)
-        response.raise_for_status()
-        return "Ollama is running"
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred: {e}")
-        return "Ollama is not running"
+def embeddings(model_name, prompt):
+    return get_client().embeddings(model_name, prompt)
 
+def heartbeat():
+    return get_client().heartbeat()
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import ollama.client as client
+from ollama.cache import get_default_embedding_cache
+
+DEFAULT_EMBEDDING_MODEL = "nomic-embed-text"
+
+
+def embed(texts, model=DEFAULT_EMBEDDING_MODEL, max_workers=4, use_cache=True):
+    """
+    Embeds texts with an Ollama embedding model, serving repeated texts from the embedding cache.
+
+    Args:
+        texts (List[str]): The texts to embed.
+        model (str): The Ollama embedding model.
+        max_workers (int): Maximum number of concurrent embedding requests.
+        use_cache (bool): Read and store embeddings in the embedding cache.
+
+    Returns:
+        np.ndarray: A (len(texts), dim) float32 matrix of L2-normalised embeddings, so that a matrix product gives
+                    cosine similarities. Returns None if any text could not be embedded.
+    """
+    cache = get_default_embedding_cache() if use_cache else None
+    unique = sorted(set(texts))
+    vectors = cache.get_many(model, unique) if cache else {}
+
+    # Only request the texts that are not already cached
+    missing = [text for text in unique if text not in vectors]
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetched = dict(zip(missing, executor.map(lambda text: client.embeddings(model, text), missing)))
+        if any(vector is None for vector in fetched.values()):
+            return None
+        fetched = {text: np.asarray(vector, dtype=np.float32) for text, vector in fetched.items()}
+        if cache:
+            cache.set_many(model, fetched)
+        vectors.update(fetched)
+
+    # Stack and normalise in one vectorised pass
+    matrix = np.stack([vectors[text] for text in texts]) if texts else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
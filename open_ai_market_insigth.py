@@ -13,6 +13,15 @@ from PyPDF2 import PdfReader
 from io import BytesIO
 from scrapegraphai.graphs import SmartScraperGraph
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from rate_limit import RateLimiter, get_rate_limiter
+from search_cache import get_search_cache
+from progress import ProgressReporter
+from ranking import rank_search_results, domain_of
+from scrape_stats import ScrapeStatsStore, classify_error, get_scrape_stats
+from chunking import DEFAULT_CHUNK_TOKENS, count_tokens, map_chunks, select_relevant_chunks
+from scraping import scrape, parse_pdf_content, parse_html_content, parse_content, process_scraping, fetch_and_extract, normalize_url, ContentStore
 from typing import Dict, List, Optional, Any, Union
 import json
 from tqdm import tqdm
@@ -26,22 +35,30 @@ import nest_asyncio
 from typing import List, Dict
 import pandas as pd
 from tqdm import tqdm
-from typing import List, Tuple
+from typing import List, Tuple, Iterator
 
 # Define types for better readability and type checking
 PromptDict = Dict[str, str]
 ResultDict = Dict[str, Any]
+# Tokens, cost in USD and run time in seconds of one SmartScraperGraph run
+GraphUsage = Tuple[Optional[int], Optional[float], float]
 
 
-def fetch_search_results(query: str, api_key: str, time_range: Optional[str] = None) -> List[Dict[str, Optional[str]]]:
+def fetch_search_results(query: str, api_key: str, time_range: Optional[str] = None,
+                         use_cache: bool = True, rate_limiter: Optional[RateLimiter] = None) -> List[Dict[str, Optional[str]]]:
     """
     Fetches search results for a given query using SerpAPI with an optional time range filter.
 
+    Results are served from the local search cache when the same (query, tbs, num) was fetched recently;
+    how long they stay fresh depends on the time range.
+
     Parameters:
         query (str): The search query.
         api_key (str): The API key for SerpAPI.
         time_range (Optional[str]): The time range for search results (e.g., 'd' for past day, 
                                     'w' for past week, 'm' for past month). Default is None.
+        use_cache (bool): Read and store results in the local search cache. Default is True.
+        rate_limiter (Optional[RateLimiter]): Limiter acquired before calling SerpAPI. Cache hits do not consume it.
 
     Returns:
         List[Dict[str, Optional[str]]]: A list of formatted search result dictionaries.
@@ -64,7 +81,15 @@ def fetch_search_results(query: str, api_key: str, time_range: Optional[str] = N
         "num": 250,
         "tbs": tbs_value  # Apply the time filter if provided
     }
+
+    cache = get_search_cache() if use_cache else None
+    if cache:
+        cached_results = cache.get(query, tbs_value, search_params["num"])
+        if cached_results is not None:
+            return cached_results
     
+    if rate_limiter is not None:
+        rate_limiter.acquire()
     search = GoogleSearch(search_params)
     result = search.get_dict()
 
@@ -73,130 +98,190 @@ def fetch_search_results(query: str, api_key: str, time_range: Optional[str] = N
             "title": item.get("title"),
             "date": item.get("date"),
             "url": item.get("link"),
-            "tags_matched": item.get("snippet_highlighted"),
+            "snippet": item.get("snippet"),
+            "tags_matched": item.get("snippet_highlighted_words"),
         }
         formatted_results.append(formatted_item)
 
+    # Only cache successful searches so errors are retried on the next run
+    if cache and "error" not in result:
+        cache.set(query, tbs_value, search_params["num"], formatted_results, time_range if time_range in time_filters else None)
+
     return formatted_results
 
 
-def scrape(url: str) -> Optional[requests.Response]:
+def get_graph_config(OPENAI_API_KEY: str) -> Dict[str, Any]:
     """
-    Scrapes content from a given URL.
-    
-    Parameters:
-        url (str): The URL to scrape.
-    
+    Build the SmartScraperGraph configuration.
+
+    Args:
+        OPENAI_API_KEY (str): The OpenAI API key.
+
     Returns:
-        Optional[requests.Response]: The HTTP response if successful, None otherwise.
+        Dict[str, Any]: The graph configuration.
     """
-    try:
-        response = requests.get(url)
-        return response
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
-        return None
+    return {
+        "llm": {
+            "api_key": OPENAI_API_KEY,
+            "model": "openai/gpt-4-turbo",
+            "temperature": 0,
+        },
+        "verbose": True,
+        "headless": True
+    }
+
 
-def parse_pdf_content(pdf_content: bytes) -> str:
+def is_valid_result(result: Dict[str, Any], field: str) -> bool:
     """
-    Parses text content from a PDF file.
-    
-    Parameters:
-        pdf_content (bytes): The PDF file content as bytes.
-    
+    Check whether a scraping result contains a usable insight for a field.
+
+    Args:
+        result (Dict[str, Any]): The SmartScraperGraph result.
+        field (str): The field to validate, e.g. "Actual Market Size in <topic>".
+
     Returns:
-        str: The extracted text from the PDF.
+        bool: True if any of the key fields of `field` is present and correctly populated.
     """
-    try:
-        reader = PdfReader(BytesIO(pdf_content))
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text())
-        return ' '.join(text).strip()
-    except Exception as e:
-        print(f"Error parsing PDF content: {e}")
-        return ""
+    main_field_data: Dict[str, str] = result.get(field, {}) if isinstance(result, dict) else {}
+    if not isinstance(main_field_data, dict):
+        return False
+
+    cagr = main_field_data.get('CAGR', '')
+    interpretation = main_field_data.get('Interpretation', '')
+    estimated_market_size = main_field_data.get('Estimated Market Size', '')
+    description = main_field_data.get('Description', '')
+
+    # Validate if any of the key fields are present and correctly populated
+    return (
+        isinstance(cagr, str) and cagr.strip() not in ['NA', '', 'No amount found'] or
+        isinstance(interpretation, str) and interpretation.strip() not in ['NA', '', 'No amount found'] or
+        isinstance(estimated_market_size, str) and estimated_market_size.strip() not in ['NA', '', 'No amount found'] or
+        isinstance(description, str) and description.strip() not in ['NA', '', 'No amount found']
+    )
+
 
-def parse_html_content(response: requests.Response) -> str:
+def graph_usage(graph: SmartScraperGraph) -> Tuple[Optional[int], Optional[float]]:
     """
-    Parses content from the HTTP response using jusText.
-    
-    Parameters:
-        response (requests.Response): The HTTP response object.
-    
-    Returns:
-        str: The extracted and concatenated text.
+    Return the tokens and cost in USD of a SmartScraperGraph run, or None values when they are not reported.
     """
-    eng_stoplist = justext.get_stoplist("English")
-    fr_stoplist = justext.get_stoplist("French")
-    stoplist = eng_stoplist.union(fr_stoplist)
-    
     try:
-        paragraphs = justext.justext(response.content, stoplist)
-        filtered_paragraphs = [paragraph.text for paragraph in paragraphs if not paragraph.is_boilerplate]
-        concatenated_text = '. '.join(filtered_paragraphs)
-        concatenated_text = re.sub(r"\.\. ", ". ", concatenated_text)
-        return concatenated_text
-    except Exception as e:
-        print(f"Error parsing HTML content: {e}")
-        return ""
+        execution_info = graph.get_execution_info() or []
+    except Exception:
+        return None, None
+    total = next((row for row in execution_info if row.get("node_name") == "TOTAL RESULT"), None)
+    if total is None:
+        return None, None
+    return total.get("total_tokens"), total.get("total_cost_USD")
+
 
-def parse_content(response: requests.Response) -> str:
+def run_graph_measured(graph: SmartScraperGraph, usage: List[GraphUsage]) -> ResultDict:
     """
-    Determines the type of content and parses it accordingly.
-    
-    Parameters:
-        response (requests.Response): The HTTP response object.
-    
-    Returns:
-        str: The extracted text from the content.
+    Run a SmartScraperGraph and append its tokens, cost and run time to `usage`, also when the run fails.
+
+    Only the run itself is timed, not the wait for a concurrency slot or the rate limiter, so the recorded
+    latency reflects the page and not the load of the scheduler.
     """
-    content_type = response.headers.get('Content-Type', '').lower()
-    if 'application/pdf' in content_type:
-        return parse_pdf_content(response.content)
-    else:
-        return parse_html_content(response)
+    started = time.monotonic()
+    try:
+        return graph.run()
+    finally:
+        usage.append((*graph_usage(graph), time.monotonic() - started))
 
-def process_scraping(url: str) -> Optional[str]:
+
+def record_scrape(stats: ScrapeStatsStore, url: str, prompt_type: str, valid: bool,
+                  usage: List[GraphUsage], error: Optional[str]) -> None:
     """
-    Processes scraping and parsing for a given URL.
-    
-    Parameters:
-        url (str): The URL to process.
-    
-    Returns:
-        Optional[str]: The extracted content text if successful, None otherwise.
+    Record a scrape in the statistics store, summing the usage of its graph runs (one per chunk for long pages).
     """
-    response = scrape(url)
-    if response:
-        return parse_content(response)
-    return None
+    tokens = [run_tokens for run_tokens, _, _ in usage if run_tokens is not None]
+    costs = [run_cost for _, run_cost, _ in usage if run_cost is not None]
+    latency = sum(run_time for _, _, run_time in usage)
+    try:
+        stats.record(url, prompt_type, valid, latency, sum(tokens) if tokens else None,
+                     sum(costs) if costs else None, error)
+    except Exception as e:
+        print(f"Could not record scrape statistics: {e}")
 
 
-def run_smart_scraper(prompts: PromptDict, df: Any, field: str, topic: str, OPENAI_API_KEY:str) -> List[ResultDict]:
+def merge_results(results: List[Optional[ResultDict]], field: str) -> ResultDict:
+    """
+    Merge the SmartScraperGraph results of the chunks of one document.
+
+    Args:
+        results (List[Optional[ResultDict]]): The chunk results, most relevant chunk first. Failed chunks are None.
+        field (str): The field validated in the results.
+
+    Returns:
+        ResultDict: The first valid result, with the missing values of `field` filled from the other results.
+                    The first non-empty result when none is valid.
+    """
+    results = [result for result in results if isinstance(result, dict)]
+    if not results:
+        return {}
+    valid = [result for result in results if is_valid_result(result, field)]
+    if not valid:
+        return results[0]
+
+    # Fill the empty values of the best result from the other valid results, in relevance order
+    merged = dict(valid[0])
+    merged_field = dict(merged.get(field) or {})
+    for result in valid[1:]:
+        for key, value in (result.get(field) or {}).items():
+            current = merged_field.get(key)
+            if current is None or isinstance(current, str) and current.strip() in ['NA', '', 'No amount found']:
+                merged_field[key] = value
+    merged[field] = merged_field
+    return merged
+
+
+def run_smart_scraper(prompts: PromptDict, df: Any, field: str, topic: str, OPENAI_API_KEY:str,
+                      first_k: int = 1, max_workers: int = 5,
+                      concurrency: Optional[threading.Semaphore] = None,
+                      rate_limiter: Optional[RateLimiter] = None,
+                      content_store: Optional[ContentStore] = None,
+                      progress: Optional[ProgressReporter] = None,
+                      max_context_tokens: int = 12000,
+                      chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                      max_chunks: int = 4,
+                      stats: Optional[ScrapeStatsStore] = None) -> List[ResultDict]:
     """
     Run the SmartScraperGraph on a list of URLs with specified prompts.
 
+    Scraping stops as soon as `first_k` valid results are found: pending scrapes are cancelled and
+    in-flight scrapes are signalled to stop, so their results are discarded instead of waited on.
+
+    Documents longer than `max_context_tokens`, or rejected by the model for exceeding its context length, are
+    split into chunks of `chunk_tokens` tokens. Only the `max_chunks` chunks most relevant to market figures are
+    scraped, concurrently, and their results are merged.
+
     Args:
         prompts (PromptDict): Dictionary with prompt names as keys and prompt texts as values.
         df (Any): DataFrame containing the URLs to be scraped.
         field (str): Specific field to validate in the scraping results.
         topic (str): Topic associated with the scraping.
+        first_k (int): Number of valid results to collect before stopping.
+        max_workers (int): Number of URLs scraped in parallel.
+        concurrency (Optional[threading.Semaphore]): Global budget shared with other scraper runs; a slot is
+                                                     held for the duration of each scrape.
+        rate_limiter (Optional[RateLimiter]): Limiter acquired before each scrape to respect the provider's rate limit.
+        content_store (Optional[ContentStore]): Store of fetched pages, shared with other scraper runs so each page
+                                                is fetched once. Pages are fetched when they are scraped and handed
+                                                to SmartScraperGraph as documents: HTML for web pages, the
+                                                extracted text for PDFs. Long documents are chunked from their
+                                                text. A store local to the run is used by default.
+        progress (Optional[ProgressReporter]): Receives "urls_scraped" and "valid_results" updates.
+        max_context_tokens (int): Documents above this many tokens are scraped chunk by chunk.
+        chunk_tokens (int): Token budget of a chunk.
+        max_chunks (int): Maximum number of chunks scraped per document.
+        stats (Optional[ScrapeStatsStore]): Store recording the outcome, latency, token usage and failure of
+                                            every scrape.
 
     Returns:
         List[ResultDict]: A list of dictionaries with the results of the scraping.
     """
 
     # Configuration for the graph model
-    graph_config: Dict[str, Any] = {
-        "llm": {
-            "api_key": OPENAI_API_KEY,
-            "model": "openai/gpt-4-turbo",
-            "temperature": 0,
-        },
-        "verbose": True,
-        "headless": True
-    }
+    graph_config = get_graph_config(OPENAI_API_KEY)
 
     all_results: List[ResultDict] = []
     last_result: Optional[ResultDict] = None
@@ -204,6 +289,54 @@ def run_smart_scraper(prompts: PromptDict, df: Any, field: str, topic: str, OPEN
     # Ensure URLs are correctly populated
     urls: List[str] = list(df.URL)
 
+    # Set once enough valid results are found; scrapes check it before and after running
+    stop_event = threading.Event()
+
+    # Every page is fetched once, by the store, and SmartScraperGraph works on the fetched document
+    content_store = content_store if content_store is not None else ContentStore(progress)
+
+    def run_graph(prompt: str, source: str, usage: List[GraphUsage]) -> ResultDict:
+        """
+        Run the SmartScraperGraph on a URL or document, holding a slot of the global budget. The tokens and cost
+        and run time are appended to `usage`.
+        """
+        if concurrency is not None:
+            concurrency.acquire()
+        try:
+            # Enough valid results may have been found while waiting for a slot
+            if stop_event.is_set():
+                return {}
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+            smart_scraper_graph = SmartScraperGraph(
+                prompt=prompt,
+                source=source,
+                config=graph_config
+            )
+            return run_graph_measured(smart_scraper_graph, usage)
+        finally:
+            if concurrency is not None:
+                concurrency.release()
+
+    def run_chunked(prompt: str, text: str, usage: List[GraphUsage]) -> ResultDict:
+        """
+        Scrape the most relevant chunks of a long document concurrently and merge their results.
+        """
+        chunks = select_relevant_chunks(text, chunk_tokens, top_k=max_chunks)
+        print(f"Scraping {len(chunks)} relevant chunks of a {count_tokens(text)}-token document.")
+
+        def extract(chunk: str) -> Optional[ResultDict]:
+            if stop_event.is_set():
+                return None
+            try:
+                return run_graph(prompt, chunk, usage)
+            except Exception as e:
+                print(f"An error occurred on a chunk: {e}")
+                return None
+
+        return map_chunks(chunks, extract, max_workers=max_chunks,
+                          reduce=lambda results: merge_results(results, field))
+
     def scrape_url(url: str, prompt_name: str, prompt: str) -> Optional[ResultDict]:
         """
         Scrape a single URL with the given prompt and validate the result.
@@ -217,16 +350,31 @@ def run_smart_scraper(prompts: PromptDict, df: Any, field: str, topic: str, OPEN
             Optional[ResultDict]: The result dictionary if a valid result is found, otherwise None.
         """
         nonlocal last_result
+        if stop_event.is_set():
+            return None
+        usage: List[GraphUsage] = []
+        result, error = None, None
         try:
-            # Initialize the SmartScraperGraph
-            smart_scraper_graph = SmartScraperGraph(
-                prompt=prompt,
-                source=url,
-                config=graph_config
-            )
+            # Fetch the page on first use and measure its text to decide whether it fits the context
+            text = content_store.get(url)
 
-            # Run the smart scraper on the URL
-            result = smart_scraper_graph.run()
+            if text and count_tokens(text) > max_context_tokens:
+                result = run_chunked(prompt, text, usage)
+            else:
+                source = content_store.source(url)
+                try:
+                    result = run_graph(prompt, source, usage)
+                except Exception as e:
+                    if "context length" not in str(e):
+                        raise
+                    # Retry the page chunk by chunk instead of throwing it away
+                    error = classify_error(e)
+                    print(f"Context length exceeded, retrying by chunks: {url}")
+                    result = run_chunked(prompt, text or "", usage)
+
+            # Discard the result if enough valid results were found while this scrape was running
+            if stop_event.is_set():
+                return None
 
             # Save the last attempted result
             last_result = {
@@ -236,37 +384,22 @@ def run_smart_scraper(prompts: PromptDict, df: Any, field: str, topic: str, OPEN
                 "analysis_type": prompt_name
             }
 
-            # Validation for specific fields
-            main_field_data: Dict[str, str] = result.get(field, {})
-            valid_result = False
-
-            if isinstance(main_field_data, dict):
-                cagr = main_field_data.get('CAGR', '')
-                interpretation = main_field_data.get('Interpretation', '')
-                estimated_market_size = main_field_data.get('Estimated Market Size', '')
-                description = main_field_data.get('Description', '')
-
-                # Validate if any of the key fields are present and correctly populated
-                valid_result = (
-                    isinstance(cagr, str) and cagr.strip() not in ['NA', '', 'No amount found'] or
-                    isinstance(interpretation, str) and interpretation.strip() not in ['NA', '', 'No amount found'] or
-                    isinstance(estimated_market_size, str) and estimated_market_size.strip() not in ['NA', '', 'No amount found'] or
-                    isinstance(description, str) and description.strip() not in ['NA', '', 'No amount found']
-                )
-
             # Stop the process if a valid result is found
-            if valid_result:
+            if is_valid_result(result, field):
                 print(f"Valid result found, stopping process. URL: {url}")
                 return last_result
         except Exception as e:
-            if "context length exceeded" in str(e):
-                print(f"Skipping due to context length error: {e}")
-            else:
-                print(f"An error occurred: {e}")
+            error = classify_error(e)
+            print(f"An error occurred: {e}")
+        finally:
+            # Record every scrape that reached the model, whatever its outcome
+            if stats is not None and (usage or error):
+                record_scrape(stats, url, prompt_name, is_valid_result(result, field), usage, error)
         return None
 
     # Use ThreadPoolExecutor for parallel scraping
-    with ThreadPoolExecutor(max_workers=5) as executor:
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
         futures = [
             executor.submit(scrape_url, url, prompt_name, prompt)
             for prompt_name, prompt in prompts.items()
@@ -276,10 +409,19 @@ def run_smart_scraper(prompts: PromptDict, df: Any, field: str, topic: str, OPEN
         # Process results as they complete
         for future in as_completed(futures):
             result = future.result()
+            if progress is not None:
+                progress.advance("urls_scraped")
             if result:
                 all_results.append(result)
-                # Break the loop early if a valid result is found
-                break
+                if progress is not None:
+                    progress.advance("valid_results")
+                # Stop early once enough valid results are found
+                if len(all_results) >= first_k:
+                    stop_event.set()
+                    break
+    finally:
+        # Cancel the scrapes that have not started and do not wait for the in-flight ones
+        executor.shutdown(wait=False, cancel_futures=True)
 
     # If no valid results were found, append the last result
     if not all_results and last_result is not None:
@@ -360,121 +502,455 @@ def get_prompts(topic: str, domain: str) -> List[Tuple[str, str]]:
     return prompts
 
 
-def search(API_KEY: str, QUERIES: List[str], domain: str) -> pd.DataFrame:
+def search(API_KEY: str, QUERIES: List[str], domain: str, max_workers: int = 8,
+           rate_limiter: Optional[RateLimiter] = None,
+           progress: Optional[ProgressReporter] = None) -> pd.DataFrame:
     """
     Fetches search results for each query using SerpAPI and processes them into a structured DataFrame.
 
+    Topics are processed concurrently: the `get_prompts` LLM call of one topic overlaps with the searches
+    of the others, and every search is issued as soon as its prompts are known, under a shared rate limiter.
+
     Args:
         API_KEY (str): The API key for accessing SerpAPI.
         QUERIES (List[str]): A list of search queries to process.
         domain (str): The domain for contextualizing the search prompts.
+        max_workers (int): Number of LLM and search calls in flight at once.
+        rate_limiter (Optional[RateLimiter]): Limiter for SerpAPI requests. Defaults to the shared "serpapi" limiter.
+        progress (Optional[ProgressReporter]): Receives "prompts" and "searches" updates.
 
     Returns:
-        pd.DataFrame: A DataFrame containing processed search results with Topic, URL, and Prompt information.
+        pd.DataFrame: A DataFrame containing processed search results with Topic, URL, Prompt, Title, Date,
+                      Snippet and Tags_Matched information, in search engine order.
     """
-    results_list = []
+    rate_limiter = rate_limiter or get_rate_limiter("serpapi")
+    progress = progress or ProgressReporter()
+    progress.add_total("prompts", len(QUERIES))
+
+    # Search results keyed on (query index, prompt index) so the final frame keeps a deterministic order
+    results_by_key: Dict[Tuple[int, int], Tuple[str, str, List[Dict[str, Optional[str]]]]] = {}
 
     print("Starting to process queries...")
 
-    # Loop through each query and corresponding prompts, fetching search results
-    for query in tqdm(QUERIES, desc="Processing queries"):
-        prompts = get_prompts(query, domain)
-        for prompt, prompt_name in prompts:
-            print(f"Fetching search results for query: {query} with prompt: {prompt_name}")
-            results = fetch_search_results(prompt + query, API_KEY)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        prompt_futures = {
+            executor.submit(get_prompts, query, domain): query_index
+            for query_index, query in enumerate(QUERIES)
+        }
+        search_futures = {}
+
+        # Issue the searches of each topic as soon as its prompts are generated
+        for future in tqdm(as_completed(prompt_futures), total=len(prompt_futures), desc="Generating prompts"):
+            query_index = prompt_futures[future]
+            query = QUERIES[query_index]
+            prompts = future.result()
+            progress.advance("prompts")
+            progress.add_total("searches", len(prompts))
+            for prompt_index, (prompt, prompt_name) in enumerate(prompts):
+                print(f"Fetching search results for query: {query} with prompt: {prompt_name}")
+                search_future = executor.submit(fetch_search_results, prompt + query, API_KEY, rate_limiter=rate_limiter)
+                search_futures[search_future] = (query_index, prompt_index, query, prompt_name)
+
+        for future in tqdm(as_completed(search_futures), total=len(search_futures), desc="Fetching search results"):
+            query_index, prompt_index, query, prompt_name = search_futures[future]
+            results = future.result()
             print(f"Fetched {len(results)} results for query: {query} with prompt: {prompt_name}")
+            results_by_key[(query_index, prompt_index)] = (query, prompt_name, results)
+            progress.advance("searches")
+
+    # Create the final DataFrame in one step from every (topic, prompt, url) record, keeping the title, date,
+    # snippet and highlighted snippet words used to rank the results
+    records = [
+        (query, item.get('url'), prompt_name, item.get('title'), item.get('date'), item.get('snippet'),
+         item.get('tags_matched'))
+        for key in sorted(results_by_key)
+        for query, prompt_name, results in [results_by_key[key]]
+        for item in results
+    ]
+    final_dataframe = pd.DataFrame(records, columns=['Topic', 'URL', 'Prompt', 'Title', 'Date', 'Snippet',
+                                                     'Tags_Matched'])
+
+    # Drop duplicate pages within each (topic, prompt) search, comparing normalised URLs so that tracking
+    # parameters, fragments and http/https variants of the same page count once
+    final_dataframe = final_dataframe.dropna(subset=['URL'])
+    is_duplicate = final_dataframe.assign(Normalized_URL=final_dataframe['URL'].map(normalize_url)).duplicated(
+        subset=['Topic', 'Prompt', 'Normalized_URL']
+    )
+    final_dataframe = final_dataframe[~is_duplicate].reset_index(drop=True)
+    print(f"Final DataFrame created with {len(final_dataframe)} rows.")
+    print(f"Search cache: {get_search_cache().stats()}")
 
-            # Convert results to DataFrame and clean it
-            dataframe = pd.DataFrame(results)
-            print(f"DataFrame created with {len(dataframe)} rows.")
+    return final_dataframe
 
-            # Drop duplicate URLs
-            dataframe.drop_duplicates(subset=['url'], inplace=True)
-            print(f"DataFrame now has {len(dataframe)} rows after dropping duplicates.")
 
-            # Append results with necessary fields
-            results_list.extend(
-                [{'Topic': query, 'URL': row['url'], 'Prompt': prompt_name} for index, row in dataframe.iterrows()]
-            )
+def select_urls(df: pd.DataFrame, topic: str, results_field: str, n: int,
+                domain_priors: Optional[Dict[str, float]] = None) -> pd.DataFrame:
+    """
+    Select the `n` most promising search results of a topic and prompt config.
 
-    # Create a final DataFrame with the aggregated results
-    final_dataframe = pd.DataFrame(results_list)
-    print(f"Final DataFrame created with {len(final_dataframe)} rows.")
+    Args:
+        df (pd.DataFrame): The search results returned by `search()`.
+        topic (str): The topic.
+        results_field (str): The "results_field" of the prompt config.
+        n (int): Maximum number of results kept.
+        domain_priors (Optional[Dict[str, float]]): Valid rate per domain learned from past scrapes.
 
-    return final_dataframe
+    Returns:
+        pd.DataFrame: Up to `n` results, best ranked first, so they are scraped first.
+    """
+    filtered_df = df[(df.Topic == topic) & (df.Prompt == results_field)]
+    return rank_search_results(filtered_df, domain_priors).head(n)
 
 
-def run_multiple_configs(OPENAI_API_KEY, topic, df, n):
-    # Define a function to create prompts based on the given type and topic
-    def create_prompt(prompt_type, topic):
-        prompt_templates = {
-            "Market Growth": f"""
-            As a journalist with expertise in market analytics. Analyse the content and provide these informations:
-
-            **Potential Market Growth in {topic}:**
-            - The Estimated potential market growth percentage. e.g., "Potential Market Growth in 2022": "9.9% CAGR"
-            - Give a short Description (sentence from the text where the potential market growth percentage is mentioned.)
-            """,
-            "Actual Market Size": f"""
-            As a journalist with expertise in market analytics, analyze the content and provide the following information:
-
-            **Market Size (Actual Market Size) in {topic}:**
-            - Estimated Market Size. e.g., "USD 196.20 billion".
-            - Give a short Description (sentence from the text where the Current market size is mentioned.)
-            - Don't put the "CAGR" in the description
-            """,
-            "Future Market Size": f"""
-            As a journalist with expertise in market analytics, analyze the content and provide the following information:
-
-            **Future Market Size in {topic} for the next coming years:**
-            - Future Estimated market size . e.g., "$100 billion".
-            - Give a short Description (sentence from the Estimated market size is mentioned.)
-            - Don't put the "CAGR" in the description
-            """,
-            "Actual Investment": f"""
-            As a journalist with expertise in market analytics, analyze the content and provide the following information:
-
-            **Actual Investment in {topic}:**
-            **Actual percentage of investment growth in 2023, 2022, and 2024 in {topic}:**
-            - Actual Amount of investment in the {topic}. e.g., "USD 16.3 billion"
-            - Actual percentage of investment growth in the {topic}. e.g., "12% in 2022, 13.1% in 2023, 14.1% in 2024" (Don't take the values of these examples)
-            - Give a short Description (sentence from the Actual Amount of investment is mentioned.)
-            - Don't put the "CAGR" in the description
-            """,
-            "Investment Growth": f"""
-            As a journalist with expertise in market analytics, analyze the content and provide the following information:
-
-            **Actual percentage of investment growth in {topic}:**
-            - Actual percentage of investment growth in the {topic}. e.g., "12% in 2023"
-            - Give a short Description (sentence where the Actual percentage of investment growth is mentioned.)
-            - Don't put the "CAGR" in the description
-            """
-        }
-        return prompt_templates[prompt_type]
-
-    # Configurations for each prompt type
-    prompt_configs = [
-        {"type": "Market Growth", "results_field": "Potential Market Growth"},
-        {"type": "Actual Market Size", "results_field": "Actual Market Size"},
-        {"type": "Future Market Size", "results_field": "Future Market Size"},
-        {"type": "Actual Investment", "results_field": "Actual Investment"},
-        {"type": "Investment Growth", "results_field": "Investment Growth"}
-    ]
+def create_prompt(prompt_type: str, topic: str) -> str:
+    """
+    Create the SmartScraper prompt of an insight type for a topic.
 
-    # Run the smart scraper based on the provided configurations
-    results = []
-    for config in prompt_configs:
+    Args:
+        prompt_type (str): One of the "type" values of PROMPT_CONFIGS.
+        topic (str): The topic the insight is about.
+
+    Returns:
+        str: The prompt text.
+    """
+    prompt_templates = {
+        "Market Growth": f"""
+        As a journalist with expertise in market analytics. Analyse the content and provide these informations:
+
+        **Potential Market Growth in {topic}:**
+        - The Estimated potential market growth percentage. e.g., "Potential Market Growth in 2022": "9.9% CAGR"
+        - Give a short Description (sentence from the text where the potential market growth percentage is mentioned.)
+        """,
+        "Actual Market Size": f"""
+        As a journalist with expertise in market analytics, analyze the content and provide the following information:
+
+        **Market Size (Actual Market Size) in {topic}:**
+        - Estimated Market Size. e.g., "USD 196.20 billion".
+        - Give a short Description (sentence from the text where the Current market size is mentioned.)
+        - Don't put the "CAGR" in the description
+        """,
+        "Future Market Size": f"""
+        As a journalist with expertise in market analytics, analyze the content and provide the following information:
+
+        **Future Market Size in {topic} for the next coming years:**
+        - Future Estimated market size . e.g., "$100 billion".
+        - Give a short Description (sentence from the Estimated market size is mentioned.)
+        - Don't put the "CAGR" in the description
+        """,
+        "Actual Investment": f"""
+        As a journalist with expertise in market analytics, analyze the content and provide the following information:
+
+        **Actual Investment in {topic}:**
+        **Actual percentage of investment growth in 2023, 2022, and 2024 in {topic}:**
+        - Actual Amount of investment in the {topic}. e.g., "USD 16.3 billion"
+        - Actual percentage of investment growth in the {topic}. e.g., "12% in 2022, 13.1% in 2023, 14.1% in 2024" (Don't take the values of these examples)
+        - Give a short Description (sentence from the Actual Amount of investment is mentioned.)
+        - Don't put the "CAGR" in the description
+        """,
+        "Investment Growth": f"""
+        As a journalist with expertise in market analytics, analyze the content and provide the following information:
+
+        **Actual percentage of investment growth in {topic}:**
+        - Actual percentage of investment growth in the {topic}. e.g., "12% in 2023"
+        - Give a short Description (sentence where the Actual percentage of investment growth is mentioned.)
+        - Don't put the "CAGR" in the description
+        """
+    }
+    return prompt_templates[prompt_type]
+
+
+# Configurations for each prompt type
+PROMPT_CONFIGS: List[Dict[str, str]] = [
+    {"type": "Market Growth", "results_field": "Potential Market Growth"},
+    {"type": "Actual Market Size", "results_field": "Actual Market Size"},
+    {"type": "Future Market Size", "results_field": "Future Market Size"},
+    {"type": "Actual Investment", "results_field": "Actual Investment"},
+    {"type": "Investment Growth", "results_field": "Investment Growth"}
+]
+
+
+def create_combined_prompt(topic: str) -> str:
+    """
+    Create a single SmartScraper prompt asking for every insight type of PROMPT_CONFIGS at once.
+
+    The answer is keyed like the per-config fields ("<type> in <topic>"), so each section can be
+    validated and consumed exactly like the result of a single-config scrape.
+
+    Args:
+        topic (str): The topic the insights are about.
+
+    Returns:
+        str: The prompt text.
+    """
+    return f"""
+    As a journalist with expertise in market analytics, analyze the content and provide the following information
+    about {topic}. Answer with a JSON object containing exactly these keys, and use "NA" for any value not found in the content.
+    Don't put the "CAGR" in the descriptions, except for the market growth.
+
+    {{
+        "Market Growth in {topic}": {{
+            "Estimated potential market growth percentage": "e.g. 9.9% CAGR",
+            "Description": "sentence from the text where the potential market growth percentage is mentioned"
+        }},
+        "Actual Market Size in {topic}": {{
+            "Estimated Market Size": "e.g. USD 196.20 billion",
+            "Description": "sentence from the text where the current market size is mentioned"
+        }},
+        "Future Market Size in {topic}": {{
+            "Future Estimated market size": "e.g. $100 billion",
+            "Description": "sentence from the text where the future estimated market size is mentioned"
+        }},
+        "Actual Investment in {topic}": {{
+            "Actual Amount of investment in the {topic}": "e.g. USD 16.3 billion",
+            "Actual percentage of investment growth in the {topic}": "growth in 2022, 2023 and 2024 if available",
+            "Description": "sentence from the text where the actual amount of investment is mentioned"
+        }},
+        "Investment Growth in {topic}": {{
+            "Actual percentage of investment growth in the {topic}": "e.g. 12% in 2023",
+            "Description": "sentence from the text where the actual percentage of investment growth is mentioned"
+        }}
+    }}
+    """
+
+
+def run_combined_extraction(OPENAI_API_KEY: str, topic: str, df: pd.DataFrame, n: int, max_workers: int = 5,
+                            concurrency: Optional[threading.Semaphore] = None,
+                            rate_limiter: Optional[RateLimiter] = None,
+                            content_store: Optional[ContentStore] = None,
+                            progress: Optional[ProgressReporter] = None,
+                            domain_priors: Optional[Dict[str, float]] = None,
+                            stats: Optional[ScrapeStatsStore] = None) -> List[ResultDict]:
+    """
+    Extract every insight type of PROMPT_CONFIGS with one SmartScraperGraph call per page.
+
+    The URLs of all configs of the topic are merged (each page once), every page is scraped with the
+    combined prompt, and each section of the answer is fanned out as if it came from its own config.
+    Scraping stops once every config has a valid result; configs without one fall back to their last
+    attempted result, as in `run_smart_scraper`.
+
+    Args:
+        OPENAI_API_KEY (str): The OpenAI API key used by SmartScraperGraph.
+        topic (str): The topic to extract insights for.
+        df (pd.DataFrame): The search results returned by `search()`.
+        n (int): Maximum number of URLs taken from each config's search results.
+        max_workers (int): Number of pages scraped in parallel.
+        concurrency (Optional[threading.Semaphore]): Global budget shared with other scraper runs.
+        rate_limiter (Optional[RateLimiter]): Limiter acquired before each scrape.
+        content_store (Optional[ContentStore]): Store of fetched pages, see `run_smart_scraper`.
+        progress (Optional[ProgressReporter]): Receives "urls_scraped" and "valid_results" updates.
+        domain_priors (Optional[Dict[str, float]]): Valid rate per domain used to rank the URLs.
+        stats (Optional[ScrapeStatsStore]): Store recording every scrape, under the "Combined" prompt type.
+
+    Returns:
+        List[ResultDict]: One result per config that produced any output, in PROMPT_CONFIGS order, in the
+                          same shape as `run_smart_scraper` results.
+    """
+    graph_config = get_graph_config(OPENAI_API_KEY)
+    prompt = create_combined_prompt(topic)
+    content_store = content_store if content_store is not None else ContentStore(progress)
+    fields = {config["type"]: config["type"] + ' in ' + topic for config in PROMPT_CONFIGS}
+
+    # Merge the URLs of every config, keeping each page once, best ranked first
+    selected = pd.concat([select_urls(df, topic, config["results_field"], n, domain_priors) for config in PROMPT_CONFIGS])
+    urls: Dict[str, str] = {}
+    for url in selected.sort_values("Score", ascending=False, kind="stable").URL:
+        urls.setdefault(normalize_url(url), url)
+
+    valid_results: Dict[str, ResultDict] = {}
+    last_results: Dict[str, ResultDict] = {}
+    lock = threading.Lock()
+    stop_event = threading.Event()
+
+    def scrape_url(url: str) -> None:
+        if stop_event.is_set():
+            return
+        usage: List[GraphUsage] = []
+        result, error = None, None
+        try:
+            # Fetch the page before taking a slot of the scraping budget
+            source = content_store.source(url)
+            if concurrency is not None:
+                concurrency.acquire()
+            try:
+                if stop_event.is_set():
+                    return
+                if rate_limiter is not None:
+                    rate_limiter.acquire()
+
+                smart_scraper_graph = SmartScraperGraph(prompt=prompt, source=source, config=graph_config)
+                result = run_graph_measured(smart_scraper_graph, usage)
+            finally:
+                if concurrency is not None:
+                    concurrency.release()
+
+            # Fan the combined answer out into one result per config
+            with lock:
+                for prompt_type, field in fields.items():
+                    if prompt_type in valid_results or not isinstance(result, dict) or field not in result:
+                        continue
+                    config_result = {
+                        "result": {field: result[field]},
+                        "topic": topic,
+                        "url": url,
+                        "analysis_type": prompt_type
+                    }
+                    last_results[prompt_type] = config_result
+                    if is_valid_result(config_result["result"], field):
+                        print(f"Valid {prompt_type} result found. URL: {url}")
+                        valid_results[prompt_type] = config_result
+                        if progress is not None:
+                            progress.advance("valid_results")
+                if len(valid_results) == len(fields):
+                    stop_event.set()
+        except Exception as e:
+            error = classify_error(e)
+            if "context length exceeded" in str(e):
+                print(f"Skipping due to context length error: {e}")
+            else:
+                print(f"An error occurred: {e}")
+        finally:
+            # The page counts as valid when any section of the combined answer is
+            if stats is not None and (usage or error):
+                valid = isinstance(result, dict) and any(
+                    is_valid_result({field: result.get(field)}, field) for field in fields.values()
+                )
+                record_scrape(stats, url, "Combined", valid, usage, error)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(scrape_url, url) for url in urls.values()]
+        for future in as_completed(futures):
+            future.result()
+            if progress is not None:
+                progress.advance("urls_scraped")
+            if stop_event.is_set():
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    with lock:
+        results = []
+        for config in PROMPT_CONFIGS:
+            result = valid_results.get(config["type"], last_results.get(config["type"]))
+            if result is not None:
+                results.append(result)
+    return results
+
+
+def run_configs_concurrently(OPENAI_API_KEY: str, topics: List[str], df: pd.DataFrame, n: int,
+                             max_concurrency: int = 10,
+                             rate_limiter: Optional[RateLimiter] = None,
+                             content_store: Optional[ContentStore] = None,
+                             combined: bool = False,
+                             progress: Optional[ProgressReporter] = None,
+                             configs: Optional[List[Dict[str, str]]] = None,
+                             domain_priors: Optional[Dict[str, float]] = None,
+                             stats: Optional[ScrapeStatsStore] = None) -> Iterator[Tuple[str, Dict[str, str], List[ResultDict]]]:
+    """
+    Run every (topic, prompt config) pair concurrently and stream results back as each pair resolves.
+
+    All pairs share a single budget of `max_concurrency` in-flight scrapes and the provider's rate limiter,
+    so a multi-topic request takes roughly as long as its slowest config rather than the sum of all of them.
+
+    Args:
+        OPENAI_API_KEY (str): The OpenAI API key used by SmartScraperGraph.
+        topics (List[str]): The topics to generate insights for.
+        df (pd.DataFrame): The search results returned by `search()`.
+        n (int): Maximum number of URLs scraped per (topic, config) pair.
+        max_concurrency (int): Global number of scrapes allowed in flight at once.
+        rate_limiter (Optional[RateLimiter]): Limiter for scrape requests. Defaults to the shared "openai" limiter.
+        content_store (Optional[ContentStore]): Store of fetched pages shared by every pair. A new store is created
+                                                for the run by default, so each page is fetched once, when it is
+                                                first scraped.
+        combined (bool): Extract all configs of a topic with one request per page (`run_combined_extraction`).
+                         The configs of a topic are then yielded together once the topic resolves.
+        progress (Optional[ProgressReporter]): Receives "configs" updates, plus the fetch and scrape counters.
+        configs (Optional[List[Dict[str, str]]]): Subset of PROMPT_CONFIGS to run. All of them by default.
+        domain_priors (Optional[Dict[str, float]]): Valid rate per domain learned from past scrapes. The `n` URLs of
+                                                    each pair are the best ranked ones and are scraped best first.
+                                                    Defaults to the priors of `stats`.
+        stats (Optional[ScrapeStatsStore]): Store recording every scrape. Its blacklisted domains are not scraped.
+                                            Defaults to the shared store.
+
+    Yields:
+        Tuple[str, Dict[str, str], List[ResultDict]]: The topic, its prompt config and the scraper results,
+                                                      in completion order.
+    """
+    concurrency = threading.BoundedSemaphore(max_concurrency)
+    rate_limiter = rate_limiter or get_rate_limiter("openai")
+    progress = progress or ProgressReporter()
+    content_store = content_store if content_store is not None else ContentStore(progress)
+    stats = stats if stats is not None else get_scrape_stats()
+
+    # Rank URLs with the domains' past yield and skip the domains that are too slow or never useful
+    domain_priors = domain_priors if domain_priors is not None else stats.domain_priors()
+    blacklist = stats.blacklist()
+    if blacklist:
+        is_blacklisted = df.URL.map(lambda url: domain_of(url) in blacklist)
+        print(f"Skipping {int(is_blacklisted.sum())} results from {len(blacklist)} blacklisted domains.")
+        df = df[~is_blacklisted]
+
+    def run_config(topic: str, config: Dict[str, str]) -> List[ResultDict]:
         prompt = create_prompt(config["type"], topic)
-        filtered_df = df[(df.Topic == topic) & (df.Prompt == config["results_field"])].head(n)
-        result = run_smart_scraper(
+        filtered_df = select_urls(df, topic, config["results_field"], n, domain_priors)
+        return run_smart_scraper(
             {config["type"]: prompt},
             filtered_df,
             config["type"] + ' in ' + topic,
             topic,
-            OPENAI_API_KEY
+            OPENAI_API_KEY,
+            concurrency=concurrency,
+            rate_limiter=rate_limiter,
+            content_store=content_store,
+            progress=progress,
+            stats=stats
         )
+
+    configs = configs if configs is not None else PROMPT_CONFIGS
+    pairs = [(topic, config) for topic in topics for config in configs]
+    progress.add_total("configs", len(pairs))
+
+    if combined:
+        # One combined extraction per topic, fanned out into its configs once it resolves
+        with ThreadPoolExecutor(max_workers=max(1, len(topics))) as executor:
+            futures = {
+                executor.submit(run_combined_extraction, OPENAI_API_KEY, topic, df, n,
+                                concurrency=concurrency, rate_limiter=rate_limiter,
+                                content_store=content_store, progress=progress,
+                                domain_priors=domain_priors, stats=stats): topic
+                for topic in topics
+            }
+            for future in as_completed(futures):
+                topic = futures[future]
+                results = future.result()
+                for config in configs:
+                    progress.advance("configs")
+                    yield topic, config, [result for result in results if result["analysis_type"] == config["type"]]
+        return
+
+    # Pair threads mostly wait on the shared budget, so one thread per pair is cheap
+    with ThreadPoolExecutor(max_workers=max(1, len(pairs))) as executor:
+        futures = {executor.submit(run_config, topic, config): (topic, config) for topic, config in pairs}
+        for future in as_completed(futures):
+            topic, config = futures[future]
+            progress.advance("configs")
+            yield topic, config, future.result()
+
+
+def run_multiple_configs(OPENAI_API_KEY, topic, df, n, max_concurrency=10, combined=False, progress=None,
+                         domain_priors=None):
+    # Run the smart scraper for every prompt config concurrently, or all configs in one request per page
+    results_by_type = {}
+    for _, config, result in run_configs_concurrently(OPENAI_API_KEY, [topic], df, n, max_concurrency=max_concurrency,
+                                                      combined=combined, progress=progress,
+                                                      domain_priors=domain_priors):
         print(result)
-        results.extend(result)
+        results_by_type[config["type"]] = result
+
+    # Keep the results in prompt config order
+    results = []
+    for config in PROMPT_CONFIGS:
+        results.extend(results_by_type.get(config["type"], []))
     return results
 
 
@@ -0,0 +1,51 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+
+class ProgressReporter:
+    """
+    Thread-safe progress counters published by the insight pipeline.
+
+    Pipeline stages call `add_total` when they learn how much work a stage has and `advance` as items
+    complete. Counter names used by the pipeline:
+
+    - "prompts": topics whose search prompts were generated (`search`)
+    - "searches": search queries answered (`search`)
+    - "urls_fetched": pages fetched into the content store (`ContentStore`)
+    - "urls_scraped": pages run through SmartScraperGraph (`run_smart_scraper`)
+    - "valid_results": valid insights found (`run_smart_scraper`)
+    - "configs": (topic, prompt config) pairs resolved (`run_configs_concurrently`)
+
+    Subclasses override `on_update` to render or persist the counters, e.g. `jobs.JobProgress`, which stores them on
+    the job polled by the Get Insights page; it may be called from worker threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.done: Dict[str, int] = {}
+        self.totals: Dict[str, int] = {}
+
+    def add_total(self, key: str, amount: int) -> None:
+        with self._lock:
+            self.totals[key] = self.totals.get(key, 0) + amount
+        self.on_update(key)
+
+    def advance(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.done[key] = self.done.get(key, 0) + amount
+        self.on_update(key)
+
+    def get(self, key: str) -> Tuple[int, Optional[int]]:
+        """
+        Returns the (done, total) counts of a counter; total is None if it was never set.
+        """
+        with self._lock:
+            return self.done.get(key, 0), self.totals.get(key)
+
+    def snapshot(self) -> Dict[str, Tuple[int, Optional[int]]]:
+        with self._lock:
+            keys = set(self.done) | set(self.totals)
+            return {key: (self.done.get(key, 0), self.totals.get(key)) for key in keys}
+
+    def on_update(self, key: str) -> None:
+        pass
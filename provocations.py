@@ -1,10 +1,26 @@
 import polars as pl
 import numpy as np
 import json
+import re
+from typing import Optional
 import streamlit as st
-from utils_provocations import read_data, classify_topics_into_themes, load_prompts, text_generation
+from utils_provocations import read_data, classify_topics_into_themes, load_prompts, text_generation_many, TOPICS_CLASSIFICATION_PROMPT_TEMPLATE
+from checkpoint import CheckpointStore, fingerprint
 
-def generate_provocations(topic_description, topic_keywords):
+# Appended to the theme prompt to obtain every sample of a topic from a single request
+NUMBERED_PROVOCATIONS_SUFFIX = """
+
+Write {n} different provocations following the instructions above, as a numbered list (1., 2., ...), one sentence per item, with no additional comments."""
+
+# A provocation is one sentence of at most 150 characters, roughly 40 tokens. In numbered mode the cap leaves room
+# for a short preamble and stops generation soon after the last needed sentence instead of producing text that is
+# discarded. Single requests are only capped when `max_tokens` is given.
+PROVOCATION_TOKENS = 64
+NUMBERED_ITEM_PATTERN = re.compile(r"^\s*\d+[.)]\s*(.+)$", re.MULTILINE)
+
+def generate_provocations(topic_description, topic_keywords, max_concurrency=4,
+                          checkpoint_path='topics_provocations.checkpoint.jsonl', model="llama3",
+                          classification_batch_size=None, embedding_model=None, numbered=False, max_tokens=None):
 
     # Step 2: Rename and group topic keywords
     print("Step 2: Renaming columns and grouping topic keywords...")
@@ -17,49 +33,144 @@ def generate_provocations(topic_description, topic_keywords):
     print("Step 3: Joining data and dropping unnecessary columns...")
     data = topic_description.join(df, on="Topic", how="outer").drop("Topic_right")
 
+    # Every classified topic and every generated set of provocations is appended to the checkpoint together with
+    # a fingerprint of its inputs. An interrupted run resumes with only the unfinished topics, and a rerun only
+    # reprocesses the topics whose keywords, description, prompt template or model changed.
+    checkpoint = CheckpointStore(checkpoint_path)
+    completed = checkpoint.load()
+
     # Step 4: Classify topics into themes
     print("Step 4: Classifying topics into themes...")
-    df_results = classify_topics_into_themes(data)
+    classification_fingerprints = {
+        topic: fingerprint(topic, sorted(keyword_list or []), TOPICS_CLASSIFICATION_PROMPT_TEMPLATE, model,
+                           embedding_model)
+        for topic, keyword_list in data.select(["Topic", "Keyword"]).rows()
+    }
+    known_themes = {
+        topic: completed[topic]["Attributed Themes"]
+        for topic, topic_fingerprint in classification_fingerprints.items()
+        if completed.get(topic, {}).get("Classification Fingerprint") == topic_fingerprint
+    }
+    print(f"Reusing themes of {len(known_themes)} unchanged topics, classifying {len(classification_fingerprints) - len(known_themes)}.")
+    df_results = classify_topics_into_themes(
+        data,
+        max_concurrency=max_concurrency,
+        known_themes=known_themes,
+        on_classified=lambda topic, themes: checkpoint.append({
+            "Topic": topic,
+            "Attributed Themes": themes,
+            "Classification Fingerprint": classification_fingerprints[topic],
+        }),
+        model=model,
+        batch_size=classification_batch_size,
+        embedding_model=embedding_model,
+    )
 
     # Step 5: Load prompts
     print("Step 5: Loading prompt templates...")
     company = "Coty"
     prompt = load_prompts("prompt.json")
 
-    # Function to generate 2 responses based on prompt and template
-    def generate_responses(row: dict) -> list:
+    n_responses = 2
+
+    # Function to build the provocation prompt of a row from its theme template
+    def build_prompt(row: dict) -> str:
         theme = row["Attributed Themes"]
         topic = row["Topic"]
         description = row["Description"]
-        
+
         # Generate the prompt from the template
         prompt_template = prompt.get(theme, {}).get("Prompt", "")
-        generated_prompt = prompt_template.format(topic=topic, description=description, company=company)
-        
-        # Generate 3 responses using the text generation function
-        responses = []
-        for _ in range(2):
-            response = text_generation(generated_prompt, "llama3")
-            
-            # Ensure the response starts with "Imagine if"
-            if not response.startswith("Imagine if"):
-                response = "Imagine if " + response.split("Imagine if", 1)[-1].strip()
-            
-            # Take only the first sentence after "Imagine if"
-            response = response.split(".", 1)[0] + "."
-            
-            responses.append(response)
-        
-        return responses
-
-    # Step 6: Generate 3 responses for each topic using `map_elements`
-    print("Step 6: Generating 3 responses for each topic using map_elements...")
-
-    # Use Polars `map_elements` to apply the `generate_responses` function to each row
+        return prompt_template.format(topic=topic, description=description, company=company)
+
+    # Function to clean a raw response into a single provocation
+    def clean_response(response: str) -> str:
+        # Ensure the response starts with "Imagine if"
+        if not response.startswith("Imagine if"):
+            response = "Imagine if " + response.split("Imagine if", 1)[-1].strip()
+
+        # Take only the first sentence after "Imagine if"
+        return response.split(".", 1)[0] + "."
+
+    # Step 6: Generate 2 responses for each remaining topic, all requests issued concurrently.
+    # The samples are meant to differ, so they bypass the generation cache. In numbered mode a single request per
+    # topic asks for all the samples as a numbered list, and only the missing samples are requested one by one.
+    print(f"Step 6: Generating {n_responses} responses for each topic...")
+    rows = df_results.select(["Attributed Themes", "Topic", "Description"]).to_dicts()
+    sample_tokens = max_tokens or (PROVOCATION_TOKENS if numbered else None)
+    provocation_fingerprints = [
+        fingerprint(row["Topic"], row["Description"], row["Attributed Themes"],
+                    prompt.get(row["Attributed Themes"], {}).get("Prompt", ""), company, model, n_responses,
+                    numbered, sample_tokens)
+        for row in rows
+    ]
+
+    # Reuse the provocations of topics whose inputs did not change
+    provocations = [
+        completed[row["Topic"]]["Provocations"]
+        if completed.get(row["Topic"], {}).get("Provocation Fingerprint") == provocation_fingerprints[i] else None
+        for i, row in enumerate(rows)
+    ]
+    # Topics whose classification failed are left for the next run
+    pending = [
+        i for i, row_provocations in enumerate(provocations)
+        if row_provocations is None and rows[i]["Attributed Themes"] is not None
+    ]
+    samples = {i: [] for i in pending}
+    reused = sum(row_provocations is not None for row_provocations in provocations)
+    print(f"Reusing provocations of {reused} unchanged topics, generating {len(pending)}.")
+
+    # Checkpoint a topic as soon as all of its samples are generated
+    def add_samples(i: int, new_samples: list) -> None:
+        samples[i].extend(new_samples[:n_responses - len(samples[i])])
+        if len(samples[i]) == n_responses:
+            provocations[i] = samples[i]
+            checkpoint.append({
+                "Topic": rows[i]["Topic"],
+                "Provocations": samples[i],
+                "Provocation Fingerprint": provocation_fingerprints[i],
+            })
+
+    if numbered and pending:
+        # Split each numbered list into its items
+        def store_list(pending_index: int, response: Optional[str]) -> None:
+            if not response:
+                return
+            items = NUMBERED_ITEM_PATTERN.findall(response)
+            add_samples(pending[pending_index], [clean_response(item.strip()) for item in items])
+
+        text_generation_many(
+            [build_prompt(rows[i]) + NUMBERED_PROVOCATIONS_SUFFIX.format(n=n_responses) for i in pending],
+            model,
+            max_concurrency=max_concurrency,
+            use_cache=False,
+            on_result=store_list,
+            # Stop at the item following the last one needed
+            options={"num_predict": sample_tokens * n_responses, "stop": [f"\n{n_responses + 1}."]},
+        )
+
+    # Request the missing samples one by one
+    missing = [i for i in pending for _ in range(n_responses - len(samples[i]))]
+    if numbered and missing:
+        print(f"Falling back to single requests for {len(missing)} samples.")
+
+    # Failed requests are not checkpointed, so their topics are regenerated on the next run
+    def store(sample_index: int, response: Optional[str]) -> None:
+        if not response:
+            return
+        add_samples(missing[sample_index], [clean_response(response)])
+
+    text_generation_many(
+        [build_prompt(rows[i]) for i in missing],
+        model,
+        max_concurrency=max_concurrency,
+        use_cache=False,
+        on_result=store,
+        options={"num_predict": sample_tokens} if sample_tokens else None,
+    )
+
     df_results = df_results.with_columns(
-        pl.struct(["Attributed Themes", "Topic", "Description"])
-        .map_elements(generate_responses, return_dtype=pl.List(pl.Utf8))  # Ensure we return a list of strings (Provocations)
-        .alias("Provocations")
+        pl.Series(name="Provocations", values=provocations, dtype=pl.List(pl.Utf8))
     )
     # Step 7: No need to convert to Pandas; work directly with Polars DataFrame
     print("Step 7: Working directly with Polars DataFrame...")
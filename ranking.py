@@ -0,0 +1,148 @@
+import re
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Weights of the ranking signals. Each signal is scaled to [0, 1].
+SNIPPET_WEIGHT = 0.5
+RECENCY_WEIGHT = 0.2
+DOMAIN_WEIGHT = 0.3
+
+# Snippet features that announce market figures; a result scores by the share of features it matches
+SNIPPET_PATTERNS = [
+    re.compile(r"\d+(?:[.,]\d+)?\s?%"),
+    re.compile(r"[$€£]\s?\d|\b(?:usd|eur|gbp)\b", re.IGNORECASE),
+    re.compile(r"\b(?:billion|million|trillion|bn|mn)\b", re.IGNORECASE),
+    re.compile(r"\bcagr\b|market size|market value|growth rate", re.IGNORECASE),
+    re.compile(r"\b20[2-3]\d\b"),
+]
+
+# Age after which a result's recency score is halved, and the score of results without a date
+RECENCY_HALF_LIFE_DAYS = 365
+UNKNOWN_RECENCY = 0.3
+
+DATE_FORMATS = ["%b %d, %Y", "%d %b %Y", "%B %d, %Y", "%Y-%m-%d"]
+RELATIVE_DATE_PATTERN = re.compile(r"(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago", re.IGNORECASE)
+RELATIVE_DATE_DAYS = {"minute": 1 / 1440, "hour": 1 / 24, "day": 1, "week": 7, "month": 30, "year": 365}
+
+
+def domain_of(url: str) -> str:
+    """
+    Returns the host of a URL without its "www." prefix.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def snippet_score(title: Optional[str], snippet: Optional[str] = None,
+                  tags_matched: Optional[Iterable[str]] = None) -> float:
+    """
+    Scores how strongly a result's title, snippet and highlighted snippet words suggest market figures.
+
+    Args:
+        title (Optional[str]): The result title.
+        snippet (Optional[str]): The result snippet.
+        tags_matched (Optional[Iterable[str]]): The highlighted snippet words returned by SerpAPI.
+
+    Returns:
+        float: The share of SNIPPET_PATTERNS matched, in [0, 1].
+    """
+    if isinstance(tags_matched, str):
+        tags_matched = [tags_matched]
+    elif not isinstance(tags_matched, (list, tuple)):
+        tags_matched = []
+    parts = [title, snippet] + list(tags_matched)
+    text = " ".join(part for part in parts if isinstance(part, str))
+    return sum(1 for pattern in SNIPPET_PATTERNS if pattern.search(text)) / len(SNIPPET_PATTERNS)
+
+
+def parse_result_date(date: Optional[str], now: datetime) -> Optional[datetime]:
+    """
+    Parses a SerpAPI result date, either absolute ("Mar 5, 2024") or relative ("3 days ago").
+    """
+    if not isinstance(date, str) or not date.strip():
+        return None
+    match = RELATIVE_DATE_PATTERN.search(date)
+    if match:
+        return now - timedelta(days=int(match.group(1)) * RELATIVE_DATE_DAYS[match.group(2).lower()])
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date.strip(), date_format)
+        except ValueError:
+            continue
+    return None
+
+
+def recency_score(date: Optional[str], now: Optional[datetime] = None) -> float:
+    """
+    Scores a result's freshness from its SerpAPI date.
+
+    Args:
+        date (Optional[str]): The result date.
+        now (Optional[datetime]): Reference time. Defaults to the current time.
+
+    Returns:
+        float: 1 for a result published now, halved every RECENCY_HALF_LIFE_DAYS; UNKNOWN_RECENCY without a date.
+    """
+    now = now or datetime.now()
+    published = parse_result_date(date, now)
+    if published is None:
+        return UNKNOWN_RECENCY
+    age_days = max(0.0, (now - published).total_seconds() / 86400)
+    return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+
+def learn_domain_priors(counts: Iterable[Tuple[str, int, int]], prior_strength: float = 2.0) -> Dict[str, float]:
+    """
+    Learns the probability that a domain yields a valid result from past scrapes.
+
+    Args:
+        counts (Iterable[Tuple[str, int, int]]): The domain, number of valid results and number of scrapes, e.g.
+                                                 from `ScrapeStatsStore.domain_stats`.
+        prior_strength (float): Weight of the neutral 0.5 prior, so a domain seen once is not ranked first or last.
+
+    Returns:
+        Dict[str, float]: The smoothed valid rate of each domain.
+    """
+    return {
+        domain: (valid + prior_strength / 2) / (attempts + prior_strength)
+        for domain, valid, attempts in counts
+    }
+
+
+def rank_search_results(df: pd.DataFrame, domain_priors: Optional[Dict[str, float]] = None,
+                        now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Orders search results by how likely they are to yield market figures.
+
+    The score combines snippet hits on numbers, percentages and currencies, the recency of the result and the
+    domain's past valid rate. Ties keep the search engine's order.
+
+    Args:
+        df (pd.DataFrame): Search results with URL and, when available, Title, Date, Snippet and Tags_Matched
+                           columns.
+        domain_priors (Optional[Dict[str, float]]): Valid rate per domain, e.g. from `learn_domain_priors`.
+                                                    Unknown domains get a neutral 0.5.
+        now (Optional[datetime]): Reference time of the recency score.
+
+    Returns:
+        pd.DataFrame: The results with a Score column, best first.
+    """
+    if df.empty:
+        return df.assign(Score=pd.Series(dtype=float))
+    domain_priors = domain_priors or {}
+    now = now or datetime.now()
+
+    titles = df["Title"] if "Title" in df else [None] * len(df)
+    dates = df["Date"] if "Date" in df else [None] * len(df)
+    snippets = df["Snippet"] if "Snippet" in df else [None] * len(df)
+    tags = df["Tags_Matched"] if "Tags_Matched" in df else [None] * len(df)
+    scores = [
+        SNIPPET_WEIGHT * snippet_score(title, snippet, tags_matched)
+        + RECENCY_WEIGHT * recency_score(date, now)
+        + DOMAIN_WEIGHT * domain_priors.get(domain_of(url), 0.5)
+        for url, title, date, snippet, tags_matched in zip(df["URL"], titles, dates, snippets, tags)
+    ]
+    return df.assign(Score=scores).sort_values("Score", ascending=False, kind="stable")
@@ -0,0 +1,62 @@
+import time
+import threading
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how many requests are started per minute.
+
+    Args:
+        requests_per_minute (float): Sustained request rate allowed.
+        burst (Optional[int]): Maximum number of requests that may start back-to-back. Defaults to one
+                               second's worth of requests (at least 1).
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1, int(self.rate)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be started.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Default per-provider request rates, in requests per minute
+PROVIDER_RATE_LIMITS: Dict[str, float] = {
+    "openai": 60,
+    "serpapi": 100,
+}
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """
+    Returns the process-wide rate limiter of a provider, shared by every caller in the process.
+
+    Args:
+        provider (str): The provider name, e.g. "openai" or "serpapi".
+
+    Returns:
+        RateLimiter: The provider's limiter, created from PROVIDER_RATE_LIMITS on first use.
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(PROVIDER_RATE_LIMITS.get(provider, 60))
+        return _limiters[provider]
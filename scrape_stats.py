@@ -0,0 +1,199 @@
+import os
+import time
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from ranking import domain_of, learn_domain_priors
+from stores import connect, process_singleton
+
+DEFAULT_STATS_PATH = os.environ.get('SCRAPE_STATS_PATH', os.path.join('.cache', 'scrape_stats.sqlite'))
+
+# Domains are blacklisted once they had at least BLACKLIST_MIN_ATTEMPTS scrapes and either almost never produced
+# a valid result or were too slow on average. Only the scrapes of the last BLACKLIST_WINDOW_DAYS count: blacklisted
+# domains are not scraped, so they are re-admitted once their scrapes age out of the window.
+BLACKLIST_MIN_ATTEMPTS = 5
+BLACKLIST_MAX_VALID_RATE = 0.05
+BLACKLIST_MAX_MEAN_LATENCY = 180.0
+BLACKLIST_WINDOW_DAYS = 14
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrapes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    domain TEXT NOT NULL,
+    url TEXT NOT NULL,
+    prompt_type TEXT NOT NULL,
+    valid INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    tokens INTEGER,
+    cost_usd REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scrapes_domain ON scrapes (domain);
+CREATE INDEX IF NOT EXISTS idx_scrapes_prompt_type ON scrapes (prompt_type);
+"""
+
+# Aggregates shared by the per-domain and per-prompt-type reports
+AGGREGATES = """
+    COUNT(*) AS attempts,
+    SUM(valid) AS valid,
+    AVG(valid) AS valid_rate,
+    AVG(latency) AS mean_latency,
+    AVG(tokens) AS mean_tokens,
+    SUM(COALESCE(cost_usd, 0)) AS cost_usd,
+    SUM(error IS NOT NULL) AS failures,
+    SUM(CASE WHEN error = 'context_length' THEN 1 ELSE 0 END) AS context_length_errors
+"""
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Returns a short failure category of a scrape exception, so failures can be counted by kind.
+    """
+    message = str(error).lower()
+    if "context length" in message or "maximum context" in message:
+        return "context_length"
+    if "rate limit" in message or "429" in message:
+        return "rate_limit"
+    if "timeout" in message or "timed out" in message:
+        return "timeout"
+    return type(error).__name__
+
+
+class ScrapeStatsStore:
+    """
+    Persistent statistics of SmartScraperGraph runs, per domain and per prompt type.
+
+    Every scrape is recorded with its outcome, latency, token usage and failure category. Aggregates are computed
+    on read, so the store can be shared by several worker processes.
+
+    Args:
+        path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def record(self, url: str, prompt_type: str, valid: bool, latency: float, tokens: Optional[int] = None,
+               cost_usd: Optional[float] = None, error: Optional[str] = None) -> None:
+        """
+        Records the outcome of one scrape.
+
+        Args:
+            url (str): The scraped URL.
+            prompt_type (str): The prompt config type, e.g. "Market Growth", or "Combined".
+            valid (bool): Whether the result passed validation.
+            latency (float): Time spent running the scrape's graphs, in seconds, excluding queueing.
+            tokens (Optional[int]): Tokens consumed by the scrape, when reported.
+            cost_usd (Optional[float]): Cost of the scrape, when reported.
+            error (Optional[str]): Failure category, see `classify_error`. None for completed scrapes.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO scrapes (created_at, domain, url, prompt_type, valid, latency, tokens, cost_usd, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), domain_of(url), url, prompt_type, int(bool(valid)), latency, tokens, cost_usd, error),
+            )
+            self._conn.commit()
+
+    def _aggregate(self, group_by: str, min_attempts: int, since: Optional[float]) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {group_by}, {AGGREGATES} FROM scrapes WHERE created_at >= ? "
+                f"GROUP BY {group_by} HAVING COUNT(*) >= ? ORDER BY valid_rate DESC, attempts DESC",
+                (since or 0, min_attempts),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def domain_stats(self, min_attempts: int = 1, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the statistics of each domain, highest valid rate first.
+
+        Args:
+            min_attempts (int): Leave out domains scraped fewer times.
+            since (Optional[float]): Only count scrapes recorded after this timestamp.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per domain with attempts, valid, valid_rate, mean_latency, mean_tokens,
+                                  cost_usd, failures and context_length_errors.
+        """
+        return self._aggregate("domain", min_attempts, since)
+
+    def prompt_type_stats(self, min_attempts: int = 1, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the statistics of each prompt type, in the same shape as `domain_stats`.
+        """
+        return self._aggregate("prompt_type", min_attempts, since)
+
+    def domain_priors(self, prior_strength: float = 2.0) -> Dict[str, float]:
+        """
+        Returns the smoothed valid rate of each domain, for `ranking.rank_search_results`.
+
+        Args:
+            prior_strength (float): Weight of the neutral 0.5 prior, see `ranking.learn_domain_priors`.
+        """
+        return learn_domain_priors(
+            ((row["domain"], row["valid"], row["attempts"]) for row in self.domain_stats()), prior_strength
+        )
+
+    def blacklist(self, min_attempts: int = BLACKLIST_MIN_ATTEMPTS, max_valid_rate: float = BLACKLIST_MAX_VALID_RATE,
+                  max_mean_latency: float = BLACKLIST_MAX_MEAN_LATENCY, since: Optional[float] = None) -> Set[str]:
+        """
+        Returns the domains not worth scraping: seen at least `min_attempts` times since `since` and either valid
+        at most `max_valid_rate` of the time or slower than `max_mean_latency` seconds of model time on average.
+        `since` defaults to BLACKLIST_WINDOW_DAYS ago.
+        """
+        since = since if since is not None else time.time() - BLACKLIST_WINDOW_DAYS * 86400
+        return {
+            row["domain"]
+            for row in self.domain_stats(min_attempts, since)
+            if row["valid_rate"] <= max_valid_rate or row["mean_latency"] > max_mean_latency
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@process_singleton
+def get_scrape_stats() -> ScrapeStatsStore:
+    """
+    Returns the process-wide ScrapeStatsStore.
+    """
+    return ScrapeStatsStore()
+
+
+def print_report(rows: List[Dict[str, Any]], key: str, blacklist: Set[str] = frozenset()) -> None:
+    """
+    Prints statistics rows as an aligned table.
+    """
+    print(f"{key:<40} {'attempts':>8} {'valid':>6} {'latency':>8} {'tokens':>8} {'cost':>8} {'fails':>6} {'ctx':>4}")
+    for row in rows:
+        flag = " (blacklisted)" if row[key] in blacklist else ""
+        print(
+            f"{row[key][:40]:<40} {row['attempts']:>8} {row['valid_rate']:>6.0%} {row['mean_latency']:>7.1f}s "
+            f"{row['mean_tokens'] or 0:>8.0f} {row['cost_usd']:>7.2f}$ {row['failures']:>6} "
+            f"{row['context_length_errors']:>4}{flag}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report scraping statistics per domain or prompt type.")
+    parser.add_argument("--by", choices=["domain", "prompt_type"], default="domain", help="Grouping of the report.")
+    parser.add_argument("--min-attempts", type=int, default=1, help="Hide groups scraped fewer times.")
+    parser.add_argument("--days", type=float, default=None, help="Only count scrapes of the last N days.")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of rows printed.")
+    parser.add_argument("--db", default=DEFAULT_STATS_PATH, help="Path of the statistics SQLite file.")
+    args = parser.parse_args()
+
+    stats = ScrapeStatsStore(args.db)
+    since = time.time() - args.days * 86400 if args.days else None
+    if args.by == "domain":
+        print_report(stats.domain_stats(args.min_attempts, since)[:args.limit], "domain", stats.blacklist())
+    else:
+        print_report(stats.prompt_type_stats(args.min_attempts, since)[:args.limit], "prompt_type")
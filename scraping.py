@@ -0,0 +1,597 @@
+import os
+import re
+import asyncio
+import tempfile
+import functools
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+import httpx
+import justext
+import requests
+from requests.adapters import HTTPAdapter
+from PyPDF2 import PdfReader
+
+# Timeout (connect, read) in seconds applied to every page fetch
+DEFAULT_TIMEOUT: Tuple[float, float] = (10, 30)
+
+# Caps applied to PDF extraction so one large report cannot dominate a run
+DEFAULT_PDF_MAX_PAGES = 60
+DEFAULT_PDF_MAX_CHARS = 200_000
+DEFAULT_PDF_MAX_BYTES = 50 * 1024 * 1024
+
+# Terms the market insight prompts look for. PDF extraction stops early once every pattern has matched.
+DEFAULT_PDF_STOP_PATTERNS: Tuple[Pattern, ...] = (
+    re.compile(r"CAGR|growth rate", re.IGNORECASE),
+    re.compile(r"market size|market value|market was valued", re.IGNORECASE),
+    re.compile(r"USD|US\$|\$\s?\d|€|billion|million", re.IGNORECASE),
+)
+
+# Query parameters that only track the visit and never change the page content
+TRACKING_PARAM_PREFIXES: Tuple[str, ...] = ('utm_',)
+TRACKING_PARAMS = frozenset({'gclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_hsenc', '_hsmi', 'ref', 'srsltid'})
+
+# A fetched page: its Content-Type, extracted text and raw HTML. The HTML is None for PDFs.
+Document = Tuple[str, Optional[str], Optional[str]]
+
+# Shared keep-alive session for single-URL scraping
+_session = requests.Session()
+_session.mount('http://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+_session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=20))
+
+
+@functools.lru_cache(maxsize=1)
+def get_stoplist() -> frozenset:
+    """
+    Returns the merged English and French jusText stoplist, built once per process.
+    """
+    eng_stoplist = justext.get_stoplist("English")
+    fr_stoplist = justext.get_stoplist("French")
+    return frozenset(eng_stoplist.union(fr_stoplist))
+
+
+def scrape(url: str, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, stream: bool = False) -> Optional[requests.Response]:
+    """
+    Scrapes content from a given URL.
+    
+    Parameters:
+        url (str): The URL to scrape.
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds.
+        stream (bool): Defer downloading the body until it is read, e.g. to stream PDFs to disk.
+    
+    Returns:
+        Optional[requests.Response]: The HTTP response if successful, None otherwise.
+    """
+    try:
+        response = _session.get(url, timeout=timeout, stream=stream)
+        return response
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
+
+def parse_pdf_content(pdf_content: bytes, max_pages: Optional[int] = None, max_chars: Optional[int] = None) -> str:
+    """
+    Parses text content from a PDF file.
+    
+    Parameters:
+        pdf_content (bytes): The PDF file content as bytes.
+        max_pages (Optional[int]): Maximum number of pages to extract. All pages by default.
+        max_chars (Optional[int]): Stop extracting once this many characters were collected.
+    
+    Returns:
+        str: The extracted text from the PDF.
+    """
+    try:
+        reader = PdfReader(BytesIO(pdf_content))
+        text = []
+        n_chars = 0
+        for page in reader.pages[:max_pages]:
+            page_text = page.extract_text() or ''
+            text.append(page_text)
+            n_chars += len(page_text)
+            if max_chars is not None and n_chars >= max_chars:
+                break
+        return ' '.join(text).strip()[:max_chars]
+    except Exception as e:
+        print(f"Error parsing PDF content: {e}")
+        return ""
+
+def _extract_pdf_pages(path: str, start: int, end: int) -> List[str]:
+    # Runs in a worker process: open the file and extract a contiguous range of pages
+    reader = PdfReader(path)
+    return [(reader.pages[i].extract_text() or '') for i in range(start, min(end, len(reader.pages)))]
+
+_pdf_executor: Optional[ProcessPoolExecutor] = None
+_pdf_executor_lock = threading.Lock()
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            _pdf_executor = ProcessPoolExecutor()
+        return _pdf_executor
+
+def download_to_tempfile(response: requests.Response, max_bytes: int = DEFAULT_PDF_MAX_BYTES,
+                         chunk_size: int = 1024 * 1024) -> Optional[str]:
+    """
+    Streams a response body to a temporary file instead of holding it in memory.
+
+    Parameters:
+        response (requests.Response): A response opened with `stream=True`.
+        max_bytes (int): Abort the download once the body exceeds this size.
+        chunk_size (int): Size of the chunks read from the socket.
+
+    Returns:
+        Optional[str]: The path of the temporary file, or None if the download failed or was too large.
+            The caller is responsible for removing the file.
+    """
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmpfile:
+        path = tmpfile.name
+        try:
+            n_bytes = 0
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                n_bytes += len(chunk)
+                if n_bytes > max_bytes:
+                    raise ValueError(f"PDF larger than {max_bytes} bytes")
+                tmpfile.write(chunk)
+        except Exception as e:
+            print(f"Error downloading PDF {response.url}: {e}")
+            tmpfile.close()
+            os.remove(path)
+            return None
+    return path
+
+def extract_pdf_file(path: str, max_pages: int = DEFAULT_PDF_MAX_PAGES, max_chars: int = DEFAULT_PDF_MAX_CHARS,
+                     stop_patterns: Sequence[Pattern] = DEFAULT_PDF_STOP_PATTERNS, pages_per_task: int = 4) -> str:
+    """
+    Extracts text from a PDF on disk, parsing page ranges in worker processes.
+
+    Page ranges are consumed in document order; extraction stops once `max_pages` or `max_chars` is reached
+    or every pattern of `stop_patterns` has matched the text collected so far, and the remaining ranges
+    are cancelled.
+
+    Parameters:
+        path (str): Path of the PDF file.
+        max_pages (int): Maximum number of pages to extract.
+        max_chars (int): Maximum number of characters to return.
+        stop_patterns (Sequence[Pattern]): Patterns the downstream prompt needs; pass an empty sequence to
+            disable early stopping.
+        pages_per_task (int): Number of pages parsed per worker task.
+
+    Returns:
+        str: The extracted text.
+    """
+    try:
+        n_pages = min(len(PdfReader(path).pages), max_pages)
+    except Exception as e:
+        print(f"Error parsing PDF content: {e}")
+        return ""
+
+    executor = _get_pdf_executor()
+    futures = [
+        executor.submit(_extract_pdf_pages, path, start, min(start + pages_per_task, n_pages))
+        for start in range(0, n_pages, pages_per_task)
+    ]
+
+    text: List[str] = []
+    n_chars = 0
+    pending_patterns = list(stop_patterns)
+    try:
+        for future in futures:
+            for page_text in future.result():
+                text.append(page_text)
+                n_chars += len(page_text)
+                pending_patterns = [pattern for pattern in pending_patterns if not pattern.search(page_text)]
+            if n_chars >= max_chars or (stop_patterns and not pending_patterns):
+                break
+    except Exception as e:
+        print(f"Error parsing PDF content: {e}")
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return ' '.join(text).strip()[:max_chars]
+
+def parse_html_bytes(html_content: bytes) -> str:
+    """
+    Extracts the non-boilerplate text of an HTML document using jusText.
+
+    Parameters:
+        html_content (bytes): The raw HTML document.
+
+    Returns:
+        str: The extracted and concatenated text.
+    """
+    try:
+        paragraphs = justext.justext(html_content, get_stoplist())
+        filtered_paragraphs = [paragraph.text for paragraph in paragraphs if not paragraph.is_boilerplate]
+        concatenated_text = '. '.join(filtered_paragraphs)
+        concatenated_text = re.sub(r"\.\. ", ". ", concatenated_text)
+        return concatenated_text
+    except Exception as e:
+        print(f"Error parsing HTML content: {e}")
+        return ""
+
+def parse_html_content(response: requests.Response) -> str:
+    """
+    Parses content from the HTTP response using jusText.
+    
+    Parameters:
+        response (requests.Response): The HTTP response object.
+    
+    Returns:
+        str: The extracted and concatenated text.
+    """
+    return parse_html_bytes(response.content)
+
+def is_pdf(content_type: str) -> bool:
+    """
+    Tells whether a Content-Type header announces a PDF document.
+    """
+    return 'application/pdf' in content_type.lower()
+
+def decode_html(content_type: str, content: bytes) -> str:
+    """
+    Decodes an HTML body with the charset of its Content-Type, UTF-8 by default.
+
+    Parameters:
+        content_type (str): The Content-Type header of the response.
+        content (bytes): The response body.
+
+    Returns:
+        str: The HTML document.
+    """
+    match = re.search(r'charset=["\']?([\w-]+)', content_type, re.IGNORECASE)
+    try:
+        return content.decode(match.group(1) if match else 'utf-8', errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+def parse_payload(content_type: str, content: bytes) -> str:
+    """
+    Parses a fetched payload according to its Content-Type.
+
+    Parameters:
+        content_type (str): The Content-Type header of the response.
+        content (bytes): The response body.
+
+    Returns:
+        str: The extracted text from the content.
+    """
+    if is_pdf(content_type):
+        return parse_pdf_content(content, max_pages=DEFAULT_PDF_MAX_PAGES, max_chars=DEFAULT_PDF_MAX_CHARS)
+    return parse_html_bytes(content)
+
+def parse_content(response: requests.Response) -> str:
+    """
+    Determines the type of content and parses it accordingly.
+    
+    Parameters:
+        response (requests.Response): The HTTP response object.
+    
+    Returns:
+        str: The extracted text from the content.
+    """
+    return parse_payload(response.headers.get('Content-Type', ''), response.content)
+
+def fetch_document(url: str) -> Optional[Document]:
+    """
+    Fetches a URL and extracts its text, keeping the Content-Type of the response and the raw HTML of web pages.
+
+    PDFs are streamed to a temporary file and extracted page by page with `extract_pdf_file`, so large
+    reports are neither held in memory nor parsed beyond what the insight prompts need.
+
+    Parameters:
+        url (str): The URL to process.
+
+    Returns:
+        Optional[Document]: The Content-Type, extracted text and HTML, None if the request failed.
+    """
+    response = scrape(url, stream=True)
+    if not response:
+        return None
+    with response:
+        content_type = response.headers.get('Content-Type', '')
+        if not is_pdf(content_type):
+            return content_type, parse_content(response), decode_html(content_type, response.content)
+        path = download_to_tempfile(response)
+    if path is None:
+        return content_type, None, None
+    try:
+        return content_type, extract_pdf_file(path), None
+    finally:
+        os.remove(path)
+
+def process_scraping(url: str) -> Optional[str]:
+    """
+    Processes scraping and parsing for a given URL.
+    
+    Parameters:
+        url (str): The URL to process.
+    
+    Returns:
+        Optional[str]: The extracted content text if successful, None otherwise.
+    """
+    document = fetch_document(url)
+    return document[1] if document else None
+
+
+def _init_parser_worker() -> None:
+    # Build the stoplist once when the worker process starts instead of on every document
+    get_stoplist()
+
+
+async def _download_pdf(response: httpx.Response, max_bytes: int) -> Optional[str]:
+    # Async counterpart of `download_to_tempfile`: stream the body to disk, giving up past `max_bytes`.
+    # Transport errors are raised so the request can be retried.
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmpfile:
+        path = tmpfile.name
+        try:
+            n_bytes = 0
+            async for chunk in response.aiter_bytes():
+                n_bytes += len(chunk)
+                if n_bytes > max_bytes:
+                    raise ValueError(f"PDF larger than {max_bytes} bytes")
+                tmpfile.write(chunk)
+        except Exception as e:
+            tmpfile.close()
+            os.remove(path)
+            if isinstance(e, httpx.HTTPError):
+                raise
+            print(f"Error downloading PDF {response.url}: {e}")
+            return None
+    return path
+
+
+async def _fetch(client: httpx.AsyncClient, url: str, host_limits: Dict[str, asyncio.Semaphore],
+                 max_per_host: int, retries: int) -> Optional[Tuple[str, Optional[bytes], Optional[str]]]:
+    # Returns the Content-Type with the body of web pages, or with the path of a temporary file holding the PDF
+    host = urlsplit(url).netloc.lower()
+    semaphore = host_limits.setdefault(host, asyncio.Semaphore(max_per_host))
+
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore, client.stream("GET", url) as response:
+                # Retry throttled and server-side failures, give up on other client errors
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise httpx.HTTPStatusError(f"{response.status_code} for {url}", request=response.request, response=response)
+                if response.status_code >= 400:
+                    print(f"Error scraping {url}: HTTP {response.status_code}")
+                    return None
+                content_type = response.headers.get('Content-Type', '')
+                # Stream PDFs to disk instead of holding them in memory
+                if is_pdf(content_type):
+                    return content_type, None, await _download_pdf(response, DEFAULT_PDF_MAX_BYTES)
+                return content_type, await response.aread(), None
+        except httpx.HTTPError as e:
+            if attempt == retries:
+                print(f"Error scraping {url}: {e}")
+                return None
+            await asyncio.sleep(2 ** attempt)
+    return None
+
+
+async def _fetch_and_extract(urls: List[str], max_connections: int, max_per_host: int, timeout: float,
+                             retries: int, executor: ProcessPoolExecutor,
+                             progress=None) -> List[Optional[Document]]:
+    loop = asyncio.get_running_loop()
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, follow_redirects=True) as client:
+        async def fetch_and_parse(url: str) -> Optional[Document]:
+            payload = await _fetch(client, url, host_limits, max_per_host, retries)
+            if progress is not None:
+                progress.advance("urls_fetched")
+            if payload is None:
+                return None
+            content_type, content, pdf_path = payload
+
+            # PDFs are extracted page by page in the PDF process pool, with the same caps and early stop as
+            # `fetch_document`
+            if is_pdf(content_type):
+                if pdf_path is None:
+                    return content_type, None, None
+                try:
+                    return content_type, await loop.run_in_executor(None, extract_pdf_file, pdf_path), None
+                finally:
+                    os.remove(pdf_path)
+
+            # Parse in the process pool so fetching other URLs continues meanwhile
+            text = await loop.run_in_executor(executor, parse_payload, content_type, content)
+            return content_type, text, decode_html(content_type, content)
+
+        return await asyncio.gather(*(fetch_and_parse(url) for url in urls))
+
+
+def fetch_documents(urls: List[str], max_connections: int = 20, max_per_host: int = 4, timeout: float = 30,
+                    retries: int = 2, processes: Optional[int] = None,
+                    progress=None) -> Dict[str, Optional[Document]]:
+    """
+    Fetches a batch of URLs concurrently and extracts their text in a process pool.
+
+    Pages are fetched with a pooled async HTTP client (per-host connection limits, timeouts and retries
+    with exponential backoff), and jusText parsing runs in worker processes that build the stoplist once
+    each. PDFs are streamed to temporary files and extracted with `extract_pdf_file`, as in `fetch_document`.
+
+    Parameters:
+        urls (List[str]): The URLs to process, e.g. `list(df.URL)` from `search()`.
+        max_connections (int): Maximum number of open connections overall.
+        max_per_host (int): Maximum number of concurrent requests to a single host.
+        timeout (float): Timeout in seconds for each request.
+        retries (int): Number of retries on connection errors, 429 and 5xx responses.
+        processes (Optional[int]): Number of parser processes. Defaults to the CPU count.
+        progress (Optional[ProgressReporter]): Receives an "urls_fetched" update per page.
+
+    Returns:
+        Dict[str, Optional[Document]]: The Content-Type, extracted text and HTML of each unique URL, None for
+            URLs that failed.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    if progress is not None:
+        progress.add_total("urls_fetched", len(unique_urls))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_parser_worker) as executor:
+        documents = asyncio.run(
+            _fetch_and_extract(unique_urls, max_connections, max_per_host, timeout, retries, executor, progress)
+        )
+    return dict(zip(unique_urls, documents))
+
+
+def fetch_and_extract(urls: List[str], **fetch_kwargs) -> Dict[str, Optional[str]]:
+    """
+    Fetches a batch of URLs concurrently and extracts their text, see `fetch_documents`.
+
+    Parameters:
+        urls (List[str]): The URLs to process, e.g. `list(df.URL)` from `search()`.
+        **fetch_kwargs: Extra arguments passed to `fetch_documents`.
+
+    Returns:
+        Dict[str, Optional[str]]: The extracted text of each unique URL, None for URLs that failed.
+    """
+    return {
+        url: document[1] if document else None
+        for url, document in fetch_documents(urls, **fetch_kwargs).items()
+    }
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalises a URL so that links to the same page compare equal.
+
+    The scheme is unified to https, the host is lower-cased and default ports dropped, tracking parameters
+    (utm_*, gclid, fbclid, ...) and the fragment are removed, the remaining query parameters are sorted and
+    trailing slashes are stripped from the path.
+
+    Parameters:
+        url (str): The URL to normalise.
+
+    Returns:
+        str: The normalised URL.
+    """
+    parts = urlsplit(url.strip())
+    scheme = 'https' if parts.scheme.lower() in ('http', 'https') else parts.scheme.lower()
+
+    netloc = parts.netloc.lower()
+    for default_port in (':80', ':443'):
+        if netloc.endswith(default_port):
+            netloc = netloc[:-len(default_port)]
+
+    path = parts.path.rstrip('/') or '/'
+
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class ContentStore:
+    """
+    Per-run registry of fetched pages, keyed on the normalised URL.
+
+    Every page is fetched and extracted at most once, however many topics or prompt configs reference it;
+    concurrent requests for the same page wait for the first fetch instead of issuing their own. Pages are
+    fetched on first use, so pages never scraped, e.g. after an early stop, are never downloaded.
+
+    Parameters:
+        progress (Optional[ProgressReporter]): Receives an "urls_fetched" update per page fetched.
+    """
+
+    def __init__(self, progress=None):
+        self._documents: Dict[str, Optional[Document]] = {}
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.progress = progress
+        self.fetches = 0
+        self.hits = 0
+
+    def _document(self, url: str) -> Optional[Document]:
+        # Returns the fetched page, fetching it on first use
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._documents:
+                self.hits += 1
+                return self._documents[key]
+            url_lock = self._url_locks.setdefault(key, threading.Lock())
+
+        with url_lock:
+            # Another thread may have fetched the page while this one was waiting
+            with self._lock:
+                if key in self._documents:
+                    self.hits += 1
+                    return self._documents[key]
+            document = fetch_document(url)
+            with self._lock:
+                self._documents[key] = document
+                self.fetches += 1
+        if self.progress is not None:
+            self.progress.advance("urls_fetched")
+        return document
+
+    def get(self, url: str) -> Optional[str]:
+        """
+        Returns the extracted text of a page, fetching it on first use.
+
+        Parameters:
+            url (str): The page URL.
+
+        Returns:
+            Optional[str]: The extracted text, None if the page could not be fetched.
+        """
+        document = self._document(url)
+        return document[1] if document else None
+
+    def source(self, url: str) -> str:
+        """
+        Returns what SmartScraperGraph should be given for a page, fetching it on first use: the raw HTML of web
+        pages, which the graph parses as a local document with its structure, and the extracted text of PDFs,
+        which the graph cannot load itself. The URL is returned when the page could not be fetched.
+
+        Parameters:
+            url (str): The page URL.
+
+        Returns:
+            str: The HTML, the extracted PDF text, or the URL.
+        """
+        document = self._document(url)
+        if not document:
+            return url
+        content_type, text, html = document
+        return (text if is_pdf(content_type) else html) or url
+
+    def prefetch(self, urls: List[str], **fetch_kwargs) -> None:
+        """
+        Fetches every page not yet in the store in one concurrent batch with `fetch_documents`, for callers that
+        need all of them rather than the first useful ones.
+
+        Parameters:
+            urls (List[str]): The page URLs.
+            **fetch_kwargs: Extra arguments passed to `fetch_documents`.
+        """
+        fetch_kwargs.setdefault("progress", self.progress)
+        with self._lock:
+            missing: Dict[str, str] = {}
+            for url in urls:
+                key = normalize_url(url)
+                if key not in self._documents:
+                    missing.setdefault(key, url)
+        if not missing:
+            return
+
+        documents = fetch_documents(list(missing.values()), **fetch_kwargs)
+        with self._lock:
+            for key, url in missing.items():
+                if key not in self._documents:
+                    self._documents[key] = documents.get(url)
+                    self.fetches += 1
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return normalize_url(url) in self._documents
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"pages": len(self._documents), "fetches": self.fetches, "hits": self.hits}
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+from stores import connect, process_singleton
+
+DEFAULT_SEARCH_CACHE_PATH = os.environ.get('SEARCH_CACHE_PATH', os.path.join('.cache', 'serpapi.sqlite'))
+
+# Part of every cache key. Bump it when the shape of the cached results changes, so older entries are not reused.
+SEARCH_CACHE_VERSION = 2
+
+# How long cached results stay fresh, in seconds, for each `time_range` filter. Narrow windows go stale
+# quickly, unfiltered searches barely move.
+TTL_BY_TIME_RANGE: Dict[Optional[str], int] = {
+    'hour': 15 * 60,
+    'day': 3 * 60 * 60,
+    'week': 24 * 60 * 60,
+    'month': 3 * 24 * 60 * 60,
+    'year': 7 * 24 * 60 * 60,
+    None: 7 * 24 * 60 * 60,
+}
+
+
+class SearchCache:
+    """
+    On-disk cache of SerpAPI results keyed on (query, tbs, num), with a TTL derived from the time range.
+
+    Results are stored as zlib-compressed JSON in SQLite. Hits, misses and expired lookups are counted
+    so reruns can report how much quota was saved.
+
+    Args:
+        path (str): Location of the SQLite file.
+    """
+
+    def __init__(self, path: str = DEFAULT_SEARCH_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                tbs TEXT NOT NULL,
+                num INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                expires_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(query: str, tbs: str, num: int) -> str:
+        return hashlib.sha256(json.dumps([SEARCH_CACHE_VERSION, query, tbs, num]).encode('utf-8')).hexdigest()
+
+    def get(self, query: str, tbs: str, num: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the cached results of a search, or None if absent or expired.
+        """
+        key = self._key(query, tbs, num)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, expires_at FROM search_results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            payload, expires_at = row
+            if expires_at < time.time():
+                self.expired += 1
+                self._conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self.hits += 1
+        return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+    def set(self, query: str, tbs: str, num: int, results: List[Dict[str, Any]], time_range: Optional[str] = None) -> None:
+        """
+        Stores the results of a search with the TTL of its time range.
+        """
+        key = self._key(query, tbs, num)
+        payload = zlib.compress(json.dumps(results, separators=(',', ':')).encode('utf-8'))
+        expires_at = time.time() + TTL_BY_TIME_RANGE.get(time_range, TTL_BY_TIME_RANGE[None])
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results (key, query, tbs, num, payload, expires_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, tbs, num, payload, expires_at),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        """
+        Deletes every expired entry and returns how many were removed.
+        """
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM search_results WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the hit/miss counters of this process and the number of stored entries.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+        lookups = self.hits + self.misses + self.expired
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+
+@process_singleton
+def get_search_cache() -> SearchCache:
+    """
+    Returns the process-wide SearchCache, creating it on first use.
+    """
+    return SearchCache()
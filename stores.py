@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import functools
+import threading
+from typing import Callable, TypeVar
+
+T = TypeVar('T')
+
+
+def ensure_parent_dir(path: str) -> None:
+    """
+    Creates the parent directories of a file path if needed.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def connect(path: str, timeout: float = 30, **kwargs) -> sqlite3.Connection:
+    """
+    Opens a SQLite database shared by threads and worker processes.
+
+    The parent directories are created if needed, the connection can be used from any thread (callers serialise
+    access themselves) and the database is switched to WAL mode so readers do not block the writer.
+
+    Args:
+        path (str): Location of the SQLite file.
+        timeout (float): Seconds to wait for another process' lock before failing.
+        **kwargs: Passed on to `sqlite3.connect`, e.g. `isolation_level`.
+
+    Returns:
+        sqlite3.Connection: The connection, returning rows as `sqlite3.Row`.
+    """
+    ensure_parent_dir(path)
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def process_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Decorates a factory so it runs once per process and every call returns the same instance.
+
+    Args:
+        factory (Callable[[], T]): Creates the shared instance.
+
+    Returns:
+        Callable[[], T]: Thread-safe getter of the instance, created on first use.
+    """
+    instances = []
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get() -> T:
+        with lock:
+            if not instances:
+                instances.append(factory())
+        return instances[0]
+
+    return get
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Make the top-level modules of the repository importable from the tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FrozenClock:
+    """
+    Stand-in for `time.time` that only moves when the test advances it.
+    """
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def frozen_time(monkeypatch):
+    """
+    Freezes `time.time` for the modules under test; move it forward with `frozen_time.advance(seconds)`.
+    """
+    clock = FrozenClock(1_000_000.0)
+    monkeypatch.setattr(time, "time", clock)
+    return clock
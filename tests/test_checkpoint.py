@@ -0,0 +1,43 @@
+from checkpoint import CheckpointStore, fingerprint
+
+
+def test_fingerprint_is_stable_and_input_sensitive():
+    assert fingerprint("Topic", {"b": 1, "a": 2}, ["x"]) == fingerprint("Topic", {"a": 2, "b": 1}, ["x"])
+    assert fingerprint("Topic", "llama3", 2) != fingerprint("Topic", "llama3", 3)
+
+
+def test_load_of_missing_log_is_empty(tmp_path):
+    assert CheckpointStore(str(tmp_path / "run.checkpoint.jsonl")).load() == {}
+
+
+def test_resume_merges_records_of_each_topic(tmp_path):
+    path = str(tmp_path / "nested" / "run.checkpoint.jsonl")
+    store = CheckpointStore(path)
+    store.append({"Topic": "Vegan cheese", "Attributed Themes": "Health", "Classification Fingerprint": "c1"})
+    store.append({"Topic": "Oat milk", "Attributed Themes": "Sustainability"})
+    store.append({"Topic": "Vegan cheese", "Provocations": ["Imagine if cheese grew on trees."]})
+    store.append({"Topic": "Vegan cheese", "Attributed Themes": "Taste", "Classification Fingerprint": "c2"})
+
+    completed = CheckpointStore(path).load()
+
+    assert completed["Vegan cheese"] == {
+        "Topic": "Vegan cheese",
+        "Attributed Themes": "Taste",
+        "Classification Fingerprint": "c2",
+        "Provocations": ["Imagine if cheese grew on trees."],
+    }
+    assert completed["Oat milk"]["Attributed Themes"] == "Sustainability"
+
+
+def test_torn_last_line_is_ignored(tmp_path):
+    path = tmp_path / "run.checkpoint.jsonl"
+    store = CheckpointStore(str(path))
+    store.append({"Topic": "Vegan cheese", "Provocations": ["Imagine if milk was grown."]})
+    with open(path, "a") as file:
+        file.write('{"Topic": "Oat milk", "Provoc')
+
+    assert list(store.load()) == ["Vegan cheese"]
+
+    # Records appended after the torn line are still read
+    store.append({"Topic": "Oat milk", "Provocations": ["Imagine if oats replaced cows."]})
+    assert sorted(store.load()) == ["Oat milk", "Vegan cheese"]
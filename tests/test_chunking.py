@@ -0,0 +1,82 @@
+import pytest
+
+tiktoken = pytest.importorskip("tiktoken")
+
+import chunking
+from chunking import CharEncoding, count_tokens, score_chunks, select_relevant_chunks, split_into_chunks
+
+
+@pytest.fixture
+def char_encoding(monkeypatch):
+    # Deterministic budgets: one token per CHARS_PER_TOKEN characters
+    monkeypatch.setattr(chunking, "get_encoding", lambda encoding_name="cl100k_base": CharEncoding())
+
+
+def test_packs_paragraphs_within_budget(char_encoding):
+    paragraphs = [f"Paragraph {i} " + "x" * 60 for i in range(10)]
+    chunks = split_into_chunks("\n\n".join(paragraphs), max_tokens=50)
+
+    assert all(count_tokens(chunk) <= 50 for chunk in chunks)
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+    assert len(chunks) == 5
+
+
+def test_cuts_oversized_paragraph_into_overlapping_windows(char_encoding):
+    text = "short intro\n\n" + "".join(f"{i:04d}" for i in range(100))
+    chunks = split_into_chunks(text, max_tokens=40, overlap_tokens=10)
+
+    assert chunks[0] == "short intro"
+    windows = chunks[1:]
+    assert all(count_tokens(window) <= 40 for window in windows)
+    # Consecutive windows share their overlap, and the last one reaches the end of the paragraph
+    for previous, window in zip(windows, windows[1:]):
+        assert previous[-10 * chunking.CHARS_PER_TOKEN:] == window[:10 * chunking.CHARS_PER_TOKEN]
+    assert windows[-1].endswith("0099")
+
+
+def test_empty_text_has_no_chunks(char_encoding):
+    assert split_into_chunks("\n\n  \n\n") == []
+
+
+def test_score_chunks_ranks_market_figures_first():
+    chunks = [
+        "Our team visited Europe last summer.",
+        "The market size reached USD 4.2 billion in 2023, a CAGR of 8.5% over the forecast period.",
+        "Revenue grew to 3 million.",
+    ]
+    scores = score_chunks(chunks)
+
+    assert scores[0] == 0
+    assert scores[1] > scores[2] > 0
+
+
+def test_terms_match_whole_words_only():
+    assert score_chunks(["Europe and euro zones"], terms=["eur"]) == [0]
+    assert score_chunks(["Priced in EUR."], terms=["eur"])[0] > 0
+
+
+def test_select_relevant_chunks_keeps_matching_chunks(char_encoding):
+    filler = "Company history and leadership. " * 5
+    text = "\n\n".join([filler, "The market size is USD 2 billion.", filler, "Growth rate of 7% per year."])
+    selected = select_relevant_chunks(text, max_tokens=45, top_k=4)
+
+    assert len(selected) == 2
+    assert all("Company history" not in chunk for chunk in selected)
+
+
+def test_select_relevant_chunks_falls_back_to_first_chunk(char_encoding):
+    text = "\n\n".join(["First paragraph. " * 8, "Second paragraph. " * 8])
+    assert select_relevant_chunks(text, max_tokens=40) == [split_into_chunks(text, 40)[0]]
+
+
+def test_encoding_falls_back_to_character_estimate(monkeypatch):
+    def unavailable(encoding_name):
+        raise OSError("offline")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", unavailable)
+    chunking.get_encoding.cache_clear()
+    try:
+        assert isinstance(chunking.get_encoding(), CharEncoding)
+        assert count_tokens("x" * 41) == 11
+    finally:
+        chunking.get_encoding.cache_clear()
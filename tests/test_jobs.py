@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import jobs
+from jobs import JobQueue, start_workers, worker_loop
+
+
+def test_claim_takes_oldest_job_once(tmp_path, frozen_time):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    batch_id = queue.enqueue(["Vegan cheese", "Oat milk"], "Food")
+
+    first = queue.claim("worker-1")
+    second = queue.claim("worker-2")
+
+    assert (first["topic"], first["status"], first["worker"]) == ("Vegan cheese", "running", "worker-1")
+    assert (second["topic"], second["worker"]) == ("Oat milk", "worker-2")
+    assert queue.claim("worker-3") is None
+    assert [job["status"] for job in queue.batch_status(batch_id)] == ["running", "running"]
+
+
+def test_concurrent_claims_never_share_a_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue([f"Topic {i}" for i in range(20)], "Food")
+    claimed = []
+
+    def work(worker):
+        while True:
+            job = queue.claim(worker)
+            if job is None:
+                return
+            claimed.append(job["id"])
+
+    threads = [threading.Thread(target=work, args=(f"worker-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == list(range(1, 21))
+
+
+def test_requeue_stale_only_requeues_silent_jobs(tmp_path, frozen_time):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    batch_id = queue.enqueue(["Silent", "Alive"], "Food")
+    silent, alive = queue.claim("worker-1"), queue.claim("worker-2")
+
+    frozen_time.advance(jobs.STALE_JOB_SECONDS - 10)
+    queue.heartbeat(alive["id"])
+    frozen_time.advance(20)
+
+    assert queue.requeue_stale() == 1
+    statuses = {job["topic"]: (job["status"], job["worker"]) for job in queue.batch_status(batch_id)}
+    assert statuses == {"Silent": ("queued", None), "Alive": ("running", "worker-2")}
+    assert queue.claim("worker-3")["id"] == silent["id"]
+
+
+def test_finished_jobs_are_never_requeued(tmp_path, frozen_time):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue(["Done", "Failed"], "Food")
+    queue.complete(queue.claim("worker")["id"])
+    queue.fail(queue.claim("worker")["id"], "Traceback")
+
+    frozen_time.advance(jobs.STALE_JOB_SECONDS * 2)
+    assert queue.requeue_stale() == 0
+
+
+def test_partial_results_survive_a_restart(tmp_path, frozen_time):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    queue.enqueue(["Vegan cheese"], "Food")
+    job = queue.claim("worker")
+    queue.save_partial(job["id"], "Market Growth", [{"topic": "Vegan cheese", "analysis_type": "Market Growth"}])
+
+    restarted = JobQueue(queue.path)
+    assert list(restarted.completed_configs(job["id"])) == ["Market Growth"]
+    assert restarted.results(job["id"]) == [{"topic": "Vegan cheese", "analysis_type": "Market Growth"}]
+
+
+def run_with_process_pool(queue, job):
+    # Stands in for the scraping stack, which parses pages in a process pool
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        length = executor.submit(len, job["topic"]).result()
+    queue.save_partial(job["id"], "Market Growth", [{"topic": job["topic"], "length": length}])
+
+
+def test_worker_loop_runs_and_completes_a_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    batch_id = queue.enqueue(["Oat milk"], "Food")
+
+    worker_loop(queue.path, max_jobs=1, job_runner=run_with_process_pool)
+
+    job, = queue.batch_status(batch_id)
+    assert (job["status"], job["error"]) == ("done", None)
+    assert queue.results(job["id"]) == [{"topic": "Oat milk", "length": 8}]
+
+
+def test_started_workers_can_run_process_pools(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    batch_id = queue.enqueue(["Oat milk"], "Food")
+
+    process, = start_workers(1, queue.path, max_jobs=1, job_runner=run_with_process_pool)
+    process.join(timeout=60)
+
+    job, = queue.batch_status(batch_id)
+    assert (job["status"], job["error"]) == ("done", None)
+    assert queue.results(job["id"]) == [{"topic": "Oat milk", "length": 8}]
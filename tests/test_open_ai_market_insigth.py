@@ -0,0 +1,40 @@
+import pytest
+
+market = pytest.importorskip("open_ai_market_insigth")
+merge_results = market.merge_results
+
+FIELD = "Market Growth in Vegan cheese"
+
+
+def result(**values):
+    return {FIELD: values}
+
+
+def test_no_usable_result_merges_to_empty():
+    assert merge_results([None, "not a dict", None], FIELD) == {}
+
+
+def test_without_valid_result_keeps_first_non_empty():
+    first = result(CAGR="NA")
+    assert merge_results([None, first, result(CAGR="")], FIELD) is first
+
+
+def test_fills_missing_values_of_best_valid_result():
+    merged = merge_results([
+        result(CAGR="8.5%", Interpretation="NA"),
+        result(CAGR="NA", Interpretation="No amount found"),
+        result(CAGR="9%", Interpretation="Steady growth driven by flexitarians"),
+        result(Description="Demand concentrated in Europe"),
+    ], FIELD)
+
+    assert merged == result(
+        CAGR="8.5%",
+        Interpretation="Steady growth driven by flexitarians",
+        Description="Demand concentrated in Europe",
+    )
+
+
+def test_merge_does_not_mutate_chunk_results():
+    best = result(CAGR="8.5%", Interpretation="NA")
+    merge_results([best, result(Interpretation="Steady growth")], FIELD)
+    assert best == result(CAGR="8.5%", Interpretation="NA")
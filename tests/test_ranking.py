@@ -0,0 +1,63 @@
+from datetime import datetime
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from ranking import (
+    RECENCY_HALF_LIFE_DAYS, UNKNOWN_RECENCY, domain_of, learn_domain_priors, rank_search_results, recency_score,
+    snippet_score,
+)
+
+NOW = datetime(2024, 6, 1)
+
+
+def test_domain_of_strips_www_and_case():
+    assert domain_of("https://WWW.Statista.com/outlook/food?x=1") == "statista.com"
+    assert domain_of("not a url") == ""
+
+
+def test_snippet_score_reads_title_snippet_and_highlighted_words():
+    assert snippet_score("Company history", "Founded by two friends.") == 0
+    assert snippet_score("Vegan cheese market", "Valued at USD 2.1 billion in 2023, CAGR of 12.5%") == 1
+    assert snippet_score("Vegan cheese", None, ["CAGR"]) == snippet_score("Vegan cheese CAGR")
+    assert snippet_score(None, float("nan"), float("nan")) == 0
+
+
+def test_recency_score_halves_every_half_life():
+    assert recency_score("Jun 1, 2024", NOW) == pytest.approx(1.0)
+    assert recency_score("2023-06-02", NOW) == pytest.approx(0.5, abs=0.01)
+    assert recency_score("3 days ago", NOW) == pytest.approx(0.5 ** (3 / RECENCY_HALF_LIFE_DAYS))
+    assert recency_score(None, NOW) == recency_score("sometime", NOW) == UNKNOWN_RECENCY
+
+
+def test_learn_domain_priors_smooths_towards_neutral():
+    priors = learn_domain_priors([("good.com", 9, 10), ("bad.com", 0, 10), ("new.com", 1, 1)])
+
+    assert priors["good.com"] == pytest.approx(10 / 12)
+    assert priors["bad.com"] == pytest.approx(1 / 12)
+    assert 0.5 < priors["new.com"] < priors["good.com"]
+
+
+def test_rank_search_results_orders_by_score():
+    df = pd.DataFrame({
+        "URL": ["https://blog.example.com/a", "https://www.report.com/b", "https://news.com/c"],
+        "Title": ["Our story", "Vegan cheese market size", "Vegan cheese news"],
+        "Date": [None, "Jan 10, 2024", "2 days ago"],
+        "Snippet": ["We love cheese.", "Valued at USD 2.1 billion, CAGR 12.5%", "Sales rose 8% in 2024"],
+        "Tags_Matched": [None, ["market size"], []],
+    })
+    ranked = rank_search_results(df, domain_priors={"report.com": 0.9, "blog.example.com": 0.1}, now=NOW)
+
+    assert list(ranked.URL) == ["https://www.report.com/b", "https://news.com/c", "https://blog.example.com/a"]
+    assert ranked.Score.is_monotonic_decreasing
+
+
+def test_rank_search_results_keeps_search_order_on_ties():
+    df = pd.DataFrame({"URL": [f"https://site{i}.com" for i in range(5)]})
+    assert list(rank_search_results(df, now=NOW).URL) == list(df.URL)
+
+
+def test_rank_search_results_of_empty_frame():
+    ranked = rank_search_results(pd.DataFrame({"URL": []}), now=NOW)
+    assert ranked.empty and "Score" in ranked
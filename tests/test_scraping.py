@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+for module in ("requests", "httpx", "justext", "PyPDF2"):
+    pytest.importorskip(module)
+
+import httpx
+
+import scraping
+from scraping import ContentStore, normalize_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("http://Example.com/Report/", "https://example.com/Report"),
+    ("https://example.com:443/a?b=2&a=1", "https://example.com/a?a=1&b=2"),
+    ("https://example.com/a?utm_source=x&id=3&gclid=y#section", "https://example.com/a?id=3"),
+    ("https://www.example.com", "https://www.example.com/"),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_normalize_url_keeps_distinct_pages_apart():
+    assert normalize_url("https://example.com/a?id=1") != normalize_url("https://example.com/a?id=2")
+
+
+def test_content_store_fetches_each_page_once(monkeypatch):
+    fetched = []
+
+    def fetch_document(url):
+        fetched.append(url)
+        return "text/html; charset=utf-8", "Market size of USD 3 billion.", "<p>Market size of USD 3 billion.</p>"
+
+    monkeypatch.setattr(scraping, "fetch_document", fetch_document)
+    store = ContentStore()
+
+    assert store.get("http://example.com/report/?utm_campaign=x") == "Market size of USD 3 billion."
+    assert store.get("https://example.com/report") == "Market size of USD 3 billion."
+    assert len(fetched) == 1
+    assert store.stats() == {"pages": 1, "fetches": 1, "hits": 1}
+
+
+def test_content_store_source_is_html_of_pages_and_text_of_pdfs(monkeypatch):
+    documents = {
+        "https://example.com/page": ("text/html", "Page text", "<html><p>Page text</p></html>"),
+        "https://example.com/report.pdf": ("application/pdf", "Report text", None),
+        "https://example.com/broken.pdf": ("application/pdf", None, None),
+    }
+    monkeypatch.setattr(scraping, "fetch_document", documents.get)
+    store = ContentStore()
+
+    assert store.source("https://example.com/page") == "<html><p>Page text</p></html>"
+    assert store.get("https://example.com/page") == "Page text"
+    assert store.source("https://example.com/report.pdf") == "Report text"
+    assert store.source("https://example.com/broken.pdf") == "https://example.com/broken.pdf"
+    assert store.source("https://example.com/missing") == "https://example.com/missing"
+
+
+@pytest.mark.parametrize("content_type, content, expected", [
+    ("text/html; charset=ISO-8859-1", "Café".encode("latin-1"), "Café"),
+    ("text/html", "Café".encode("utf-8"), "Café"),
+    ("text/html; charset=unknown-charset", b"plain", "plain"),
+])
+def test_decode_html(content_type, content, expected):
+    assert scraping.decode_html(content_type, content) == expected
+
+
+PDF_BYTES = b"%PDF-1.4 " + b"0" * 4096
+HTML = "<html><body><p>The vegan cheese market is valued at USD 2 billion.</p></body></html>"
+
+
+@pytest.fixture
+def http_server(monkeypatch):
+    # Serves the bulk fetcher from an in-memory transport instead of the network
+    def handler(request):
+        if request.url.path.endswith(".pdf"):
+            return httpx.Response(200, headers={"Content-Type": "application/pdf"}, content=PDF_BYTES)
+        if request.url.path == "/missing":
+            return httpx.Response(404)
+        return httpx.Response(200, headers={"Content-Type": "text/html; charset=utf-8"}, content=HTML.encode())
+
+    client_class = httpx.AsyncClient
+    monkeypatch.setattr(scraping.httpx, "AsyncClient",
+                        lambda **kwargs: client_class(transport=httpx.MockTransport(handler), **kwargs))
+
+
+@pytest.fixture
+def extracted_pdfs(monkeypatch):
+    # Records the size and path of every PDF handed to the page-level extractor
+    extracted = []
+
+    def extract_pdf_file(path):
+        with open(path, "rb") as file:
+            extracted.append((path, len(file.read())))
+        return "Market size of USD 2 billion."
+
+    monkeypatch.setattr(scraping, "extract_pdf_file", extract_pdf_file)
+    return extracted
+
+
+def test_fetch_documents_streams_pdfs_to_the_page_extractor(http_server, extracted_pdfs):
+    documents = scraping.fetch_documents(["https://example.com/page", "https://example.com/report.pdf",
+                                          "https://example.com/missing"], retries=0, processes=1)
+
+    content_type, _, html = documents["https://example.com/page"]
+    assert (content_type, html) == ("text/html; charset=utf-8", HTML)
+    assert documents["https://example.com/report.pdf"] == ("application/pdf", "Market size of USD 2 billion.", None)
+    assert documents["https://example.com/missing"] is None
+
+    (path, size), = extracted_pdfs
+    assert size == len(PDF_BYTES)
+    assert not os.path.exists(path)
+
+
+def test_fetch_documents_caps_pdf_size(http_server, extracted_pdfs, monkeypatch):
+    monkeypatch.setattr(scraping, "DEFAULT_PDF_MAX_BYTES", 1024)
+
+    documents = scraping.fetch_documents(["https://example.com/report.pdf"], retries=0, processes=1)
+
+    assert documents["https://example.com/report.pdf"] == ("application/pdf", None, None)
+    assert extracted_pdfs == []
@@ -0,0 +1,45 @@
+from search_cache import SearchCache, TTL_BY_TIME_RANGE
+
+RESULTS = [{"title": "Plant-based food market", "url": "https://example.com/report", "snippet": "USD 3 billion"}]
+
+
+def test_get_returns_stored_results_until_ttl(tmp_path, frozen_time):
+    cache = SearchCache(str(tmp_path / "cache" / "serpapi.sqlite"))
+    cache.set("vegan cheese market size", "qdr:d", 10, RESULTS, time_range="day")
+
+    frozen_time.advance(TTL_BY_TIME_RANGE["day"] - 1)
+    assert cache.get("vegan cheese market size", "qdr:d", 10) == RESULTS
+
+    frozen_time.advance(2)
+    assert cache.get("vegan cheese market size", "qdr:d", 10) is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_depends_on_time_range(tmp_path, frozen_time):
+    cache = SearchCache(str(tmp_path / "cache" / "serpapi.sqlite"))
+    cache.set("narrow", "qdr:h", 10, RESULTS, time_range="hour")
+    cache.set("wide", "", 10, RESULTS)
+
+    frozen_time.advance(TTL_BY_TIME_RANGE["hour"] + 1)
+    assert cache.get("narrow", "qdr:h", 10) is None
+    assert cache.get("wide", "", 10) == RESULTS
+
+
+def test_key_covers_tbs_and_num(tmp_path, frozen_time):
+    cache = SearchCache(str(tmp_path / "cache" / "serpapi.sqlite"))
+    cache.set("query", "qdr:w", 10, RESULTS, time_range="week")
+
+    assert cache.get("query", "qdr:m", 10) is None
+    assert cache.get("query", "qdr:w", 20) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_purge_expired(tmp_path, frozen_time):
+    cache = SearchCache(str(tmp_path / "cache" / "serpapi.sqlite"))
+    cache.set("old", "qdr:h", 10, RESULTS, time_range="hour")
+    cache.set("fresh", "qdr:y", 10, RESULTS, time_range="year")
+
+    frozen_time.advance(TTL_BY_TIME_RANGE["hour"] + 1)
+    assert cache.purge_expired() == 1
+    assert cache.stats()["entries"] == 1
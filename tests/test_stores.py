@@ -0,0 +1,31 @@
+import threading
+
+from stores import connect, process_singleton
+
+
+def test_connect_creates_parent_dirs_in_wal_mode(tmp_path):
+    conn = connect(str(tmp_path / "nested" / "store.sqlite"))
+
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert dict(conn.execute("SELECT 1 AS one").fetchone()) == {"one": 1}
+
+
+def test_process_singleton_creates_one_instance_across_threads():
+    created = []
+
+    @process_singleton
+    def get_instance():
+        """Docstring of the getter."""
+        created.append(object())
+        return created[-1]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_instance())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(result is created[0] for result in results)
+    assert get_instance.__doc__ == "Docstring of the getter."
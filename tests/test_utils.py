@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+utils = pytest.importorskip("utils")
+pd = pytest.importorskip("pandas")
+
+from utils import SECTIONS, extract_sections_from_generated_texts, generate_market_analysis
+
+
+def extract(*texts):
+    df = pd.DataFrame({"Topic": [f"Topic {i}" for i in range(len(texts))], "Generated_Text": list(texts)})
+    return extract_sections_from_generated_texts(df).to_dict("records")
+
+
+def test_extracts_every_section_of_the_template():
+    text = "### **Title:** Analysis\n\n" + "".join(
+        f"### **{section}:**\n\n- {section} bullet\n\n" for section in SECTIONS
+    ) + "### Conclusion:\n\nDone."
+    row, = extract(text)
+
+    assert list(row) == SECTIONS + ["Topic"]
+    assert [row[section] for section in SECTIONS[:-1]] == [f"- {section} bullet" for section in SECTIONS[:-1]]
+    assert row[SECTIONS[-1]] == f"- {SECTIONS[-1]} bullet\n\n### Conclusion:\n\nDone."
+
+
+def test_sections_out_of_template_order():
+    row, = extract("### Trends:\n\nA\n\n### Key Statistics:\n\nB\n\n### End")
+    assert (row["Key Statistics"], row["Trends"]) == ("B", "A")
+
+
+def test_section_without_terminator_does_not_hide_later_sections():
+    row, = extract("### Key Statistics:\n\nK no end ### Trends:\n\nT\n\n### x")
+    # The unterminated section runs until the next "\n\n###", as with the per-section regular expressions
+    assert (row["Key Statistics"], row["Trends"]) == ("K no end ### Trends:\n\nT", "T")
+
+
+def test_missing_sections_and_texts_are_empty():
+    rows = extract("No sections at all.", None)
+    assert all(row[section] == "" for row in rows for section in SECTIONS)
+
+
+def test_market_analysis_bounds_requests_across_rows_and_chunks():
+    lock = threading.Lock()
+    in_flight = [0]
+    peak = [0]
+
+    def generate(prompt, model):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return "analysis"
+
+    texts = pd.DataFrame({"Topic": ["a", "b", "c"], "Text": ["market size " * 200] * 3})
+    result = generate_market_analysis(texts, generate, max_workers=2, max_tokens=50, max_chunks=4)
+
+    assert list(result["Generated_Text"]) == ["analysis"] * 3
+    assert peak[0] == 2
@@ -0,0 +1,44 @@
+import pytest
+
+utils_provocations = pytest.importorskip("utils_provocations")
+parse_batch_classification = utils_provocations.parse_batch_classification
+
+TOPICS = ["Vegan Cheese", "Oat Milk", "Lab-grown Meat"]
+
+
+def test_parses_json_mapping_surrounded_by_text():
+    response = """Here is the classification:
+{"Vegan Cheese": "Lifestyle Changes", "Oat Milk": "Environmental Shifts", "Lab-grown Meat": "Technological Innovation"}
+Let me know if you need anything else."""
+
+    assert parse_batch_classification(response, TOPICS) == {
+        "Vegan Cheese": "Lifestyle Changes",
+        "Oat Milk": "Environmental Shifts",
+        "Lab-grown Meat": "Technological Innovation",
+    }
+
+
+def test_matches_topics_case_insensitively_and_normalises_themes():
+    response = '{" vegan cheese ": "lifestyle changes and cultural evolution", "OAT MILK": ["Economic Transformation"]}'
+
+    assert parse_batch_classification(response, TOPICS) == {
+        "Vegan Cheese": "Lifestyle Changes, Cultural Evolution",
+        "Oat Milk": "Economic Transformation",
+    }
+
+
+def test_leaves_out_missing_topics_and_unknown_themes():
+    response = '{"Vegan Cheese": "Culinary Trends", "Kombucha": "Lifestyle Changes"}'
+
+    assert parse_batch_classification(response, TOPICS) == {}
+
+
+@pytest.mark.parametrize("response", [
+    "",
+    "I cannot classify these topics.",
+    '{"Vegan Cheese": "Lifestyle Changes",',
+    '["Lifestyle Changes"]',
+    '} "Vegan Cheese": "Lifestyle Changes" {',
+])
+def test_unparseable_responses_classify_nothing(response):
+    assert parse_batch_classification(response, TOPICS) == {}
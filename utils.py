@@ -1,19 +1,24 @@
-import io
 import os
 import re
-import sys
 import json
+import time
+import inspect
+import threading
 import gcsfs
 import tempfile
 from pathlib import Path
 from datetime import datetime
 from google.cloud import storage
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 import polars as pl
 import re
 import pandas as pd
 
 import ollama.client as client
+from ollama.cache import get_default_cache
+from chunking import count_tokens, map_chunks, select_relevant_chunks
 
 
 def read_data(bucket_name: str, file_path: str) -> pl.DataFrame:
@@ -69,38 +74,34 @@ def read_excel_sheet(bucket_name: str, file_path: str, sheet_name: str) -> pl.Da
         
     return dataframe
 
-def text_generation(messages: str, model: str) -> str:
+def text_generation(messages: str, model: str, use_cache: bool = True, system: Optional[str] = None) -> str:
     """
     Generates text using a specified model and message prompt.
 
     Args:
         messages (str): The message prompt.
         model (str): The model to be used for text generation.
+        use_cache (bool): Serve the response from the generation cache when the same prompt was already generated.
+        system (Optional[str]): Optional system prompt. Instructions shared by many prompts belong here, so the
+            server can reuse the evaluated prefix across requests.
 
     Returns:
         str: The generated text.
     """
-    old_stdout = sys.stdout
-    sys.stdout = text_trap = io.StringIO()
-    response, _ = client.generate(model_name=model, prompt=messages)
-    sys.stdout = old_stdout
+    cache = get_default_cache() if use_cache else None
+    if cache:
+        cached = cache.get(model, messages, system=system)
+        if cached is not None:
+            return cached
+
+    response, _ = client.generate(model_name=model, prompt=messages, system=system, echo=False)
+    if cache:
+        cache.set(model, messages, response, system=system)
     return str(response)
 
-def generate_market_analysis(texts_df_grouped, text_generation_function):
-    """
-    Apply the text generation function to each row and create a new dataframe.
-
-    Parameters:
-    texts_df_grouped (DataFrame): A DataFrame containing the grouped text data.
-    text_generation_function (function): The function to generate text based on the input.
-
-    Returns:
-    DataFrame: A DataFrame with the generated text for market analysis.
-    """
-    # Apply the text generation function to each row and create a new dataframe
-    generated_texts_df = texts_df_grouped.assign(
-        Generated_Text=lambda df: df['Text'].apply(
-            lambda text: text_generation_function(f"""Act as a journalist with expertise in market analytics. Please analyze the following content: {text}. Identify from {text} a comprehensive analysis related to AI Powered Care and it's key funding statistics, market growth potential, and market size evaluation.
+# Static instructions of the market analysis, sent as the system prompt so they are identical across rows and the
+# source text is only sent once, in the user prompt
+MARKET_ANALYSIS_SYSTEM_PROMPT = """Act as a journalist with expertise in market analytics. You will be given content to analyze. Identify from the content a comprehensive analysis related to AI Powered Care and its key funding statistics, market growth potential, and market size evaluation.
 
 Follow this template for your answer: 
 
@@ -133,12 +134,139 @@ Follow this template for your answer:
 
 ## Output Format:
 - Present the information in a structured report format, with clear headings and subheadings for each section.
-- Include tables or charts where relevant to visualize key statistics.""", "llama3")
-        )
+- Include tables or charts where relevant to visualize key statistics."""
+
+MARKET_ANALYSIS_PROMPT_TEMPLATE = "Please analyze the following content: {text}"
+
+# Reduce step of long texts analysed chunk by chunk
+MARKET_ANALYSIS_MERGE_PROMPT_TEMPLATE = """The following reports analyze different excerpts of the same content. Merge them into a single report following the template, keeping every figure they support and dropping duplicates.
+
+{analyses}"""
+
+def accepts_keyword(function, name: str) -> bool:
+    """
+    Tells whether a function can be called with a given keyword argument.
+
+    Parameters:
+    function (function): The function to inspect.
+    name (str): The keyword argument.
+
+    Returns:
+    bool: True if the function has a parameter of that name or takes **kwargs.
+    """
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    return any(
+        parameter.kind == inspect.Parameter.VAR_KEYWORD
+        or (parameter.name == name and parameter.kind != inspect.Parameter.POSITIONAL_ONLY)
+        for parameter in parameters
     )
+
+def generate_market_analysis(texts_df_grouped, text_generation_function=text_generation, max_workers: int = 4,
+                             model: str = "llama3", max_tokens: Optional[int] = None, max_chunks: int = 4):
+    """
+    Apply the text generation function to each row and create a new dataframe.
+
+    Rows are generated concurrently, and the chunks of long texts too, but at most `max_workers` requests are sent
+    to Ollama at once across all rows and chunks. The Ollama server only runs as many generations in parallel as
+    its OLLAMA_NUM_PARALLEL setting allows, so `max_workers` should not exceed it.
+
+    Parameters:
+    texts_df_grouped (DataFrame): A DataFrame containing the grouped text data.
+    text_generation_function (function): The function to generate text based on the input. It is called with the
+        prompt and the model, plus a `system` keyword argument if it accepts one; otherwise the system prompt is
+        prepended to the prompt.
+    max_workers (int): Maximum number of generation requests in flight at once.
+    model (str): The model used for the analysis.
+    max_tokens (Optional[int]): Texts longer than this many tokens are split into chunks of this size. The
+        `max_chunks` chunks most relevant to market figures are analysed concurrently and the partial analyses
+        are merged by a final request. Texts are sent whole if None.
+    max_chunks (int): Maximum number of chunks analysed per text.
+
+    Returns:
+    DataFrame: A DataFrame with the generated text for market analysis.
+    """
+    texts = list(texts_df_grouped['Text'])
+    supports_system = accepts_keyword(text_generation_function, "system")
+    # Shared by the row and chunk threads, which only wait on each other outside of it
+    requests_budget = threading.BoundedSemaphore(max_workers)
+
+    def call(prompt: str) -> str:
+        with requests_budget:
+            if supports_system:
+                return text_generation_function(prompt, model, system=MARKET_ANALYSIS_SYSTEM_PROMPT)
+            return text_generation_function(MARKET_ANALYSIS_SYSTEM_PROMPT + "\n\n" + prompt, model)
+
+    def analyse(text: str) -> str:
+        return call(MARKET_ANALYSIS_PROMPT_TEMPLATE.format(text=text))
+
+    def merge(analyses: list) -> str:
+        return call(MARKET_ANALYSIS_MERGE_PROMPT_TEMPLATE.format(analyses="\n\n---\n\n".join(analyses)))
+
+    def generate(text: str) -> str:
+        if max_tokens is None or count_tokens(text) <= max_tokens:
+            return analyse(text)
+        # Map the relevant chunks of long texts and reduce their analyses into one report
+        chunks = select_relevant_chunks(text, max_tokens, top_k=max_chunks)
+        if len(chunks) == 1:
+            return analyse(chunks[0])
+        return map_chunks(chunks, analyse, max_workers=max_chunks, reduce=merge)
+
+    # Generate the rows concurrently, keeping the input order
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        generated_texts = list(tqdm(executor.map(generate, texts), total=len(texts), desc="Market analysis"))
+    elapsed = time.perf_counter() - start
+    if texts:
+        print(f"Generated {len(texts)} market analyses in {elapsed:.1f}s ({len(texts) / elapsed:.2f} rows/sec).")
+
+    # Create a new dataframe with the generated text of each row
+    generated_texts_df = texts_df_grouped.assign(Generated_Text=generated_texts)
     return generated_texts_df
 
 
+# Sections of a generated market analysis, in order. Each section runs until the next "###" header, except the last
+# one which runs until the end of the text.
+SECTIONS = [
+    'Key Statistics',
+    'Trends',
+    'Competitive Insights',
+    'Consumer Insights',
+    'Emerging Opportunities or Threats',
+]
+
+# Headers opening each section and the marker closing every section but the last one
+SECTION_HEADERS = {section: f'### {section}:\n\n' for section in SECTIONS}
+SECTION_END = '\n\n###'
+
+
+def section_expressions(column: str = 'Generated_Text') -> list:
+    """
+    Builds the Polars expressions extracting every section of the cleaned generated texts of a column.
+
+    Each section is found with literal substring searches instead of regular expressions: the text is split once
+    after the first occurrence of the section header, then the remainder once before the next "\n\n###". Every
+    section is searched independently, so sections may appear in any order, as with one `re.search` per section.
+
+    Args:
+        column (str): The column holding the generated texts, with the '**' markers already removed.
+
+    Returns:
+        list: One expression per section, each producing a column named after the section. Missing sections, and
+              sections other than the last without a closing "\n\n###", are empty strings.
+    """
+    expressions = []
+    for section, header in SECTION_HEADERS.items():
+        content = pl.col(column).str.splitn(header, 2).struct.field('field_1')
+        if section != SECTIONS[-1]:
+            parts = content.str.splitn(SECTION_END, 2)
+            content = pl.when(parts.struct.field('field_1').is_not_null()).then(parts.struct.field('field_0'))
+        expressions.append(content.fill_null('').str.strip_chars().alias(section))
+    return expressions
+
+
 def extract_sections_from_generated_texts(generated_texts_df):
     """
     Extract sections from generated text and create a DataFrame.
@@ -149,38 +277,19 @@ def extract_sections_from_generated_texts(generated_texts_df):
     Returns:
     DataFrame: A DataFrame with extracted sections and their respective topics.
     """
-    # Function to extract sections from the input text
-    def extract_sections(text):
-        # Clean the text by removing any occurrences of '**'
-        cleaned_text = re.sub(r'\*\*', '', text)
-
-        # Regular expressions to match each section
-        sections = {
-            'Key Statistics': re.search(r'### Key Statistics:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
-            'Trends': re.search(r'### Trends:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
-            'Competitive Insights': re.search(r'### Competitive Insights:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
-            'Consumer Insights': re.search(r'### Consumer Insights:\n\n(.*?)\n\n###', cleaned_text, re.DOTALL),
-            'Emerging Opportunities or Threats': re.search(r'### Emerging Opportunities or Threats:\n\n(.*)', cleaned_text, re.DOTALL)
-        }
-        
-        # Extracting the content for each section
-        extracted_data = {section: (match.group(1).strip() if match else '') for section, match in sections.items()}
-        
-        return extracted_data
-
-    # List to hold all extracted data
-    all_extracted_data = []
-
-    # Iterating over each row in generated_texts_df
-    for _, row in generated_texts_df.iterrows():
-        # Extracting sections from the current text
-        extracted_data = extract_sections(row['Generated_Text'])
-        # Adding the Topic to the extracted data
-        extracted_data['Topic'] = row['Topic']
-        # Appending to the list
-        all_extracted_data.append(extracted_data)
-
-    # Creating a DataFrame from the list of extracted data
-    final_df = pd.DataFrame(all_extracted_data)
-    
-    return final_df
+    # Build the Polars frame from plain lists, so no Arrow conversion of the pandas frame is needed
+    texts_df = pl.DataFrame({
+        'Topic': generated_texts_df['Topic'].tolist(),
+        'Generated_Text': generated_texts_df['Generated_Text'].tolist(),
+    }, schema={'Topic': pl.Utf8, 'Generated_Text': pl.Utf8})
+
+    # Remove any occurrences of '**' once, then extract the five sections with vectorised substring searches.
+    # The lazy engine computes the split shared by the expressions of a section only once.
+    final_df = (
+        texts_df.lazy()
+        .with_columns(pl.col('Generated_Text').fill_null('').str.replace_all('**', '', literal=True))
+        .select(section_expressions() + [pl.col('Topic')])
+        .collect()
+    )
+
+    return pd.DataFrame(final_df.to_dict(as_series=False))
@@ -1,7 +1,5 @@
-import io
 import os
 import re
-import sys
 import json
 import time
 import gcsfs
@@ -9,9 +7,13 @@ import tempfile
 from pathlib import Path
 from datetime import datetime
 from google.cloud import storage
-from typing import List, Dict, Tuple, Any, Optional, Union
+from typing import List, Dict, Tuple, Any, Optional, Union, Callable
 import pandas as pd
 import ollama.client as client
+from ollama.cache import get_default_cache
+from ollama.async_client import generate_many
+from ollama.embeddings import embed
+import numpy as np
 import polars as pl
 from tqdm import tqdm
 
@@ -160,23 +162,51 @@ def save_dataframe_to_gcs_pd(dataframe: pd.DataFrame, bucket: str, file_path: st
     # Remove the temporary file
     os.remove(temp_file_name)
 
-def text_generation(messages: str, model: str) -> str:
+def text_generation(messages: str, model: str, use_cache: bool = True) -> str:
     """
     Generates text using a specified model and message prompt.
 
     Parameters:
     messages (str): The message prompt.
     model (str): The model to be used for text generation.
+    use_cache (bool): Serve the response from the generation cache when the same prompt was already generated.
 
     Returns:
     str: The generated text.
     """
-    old_stdout = sys.stdout
-    sys.stdout = text_trap = io.StringIO()
-    response, _ = client.generate(model_name=model, prompt=messages)
-    sys.stdout = old_stdout
+    cache = get_default_cache() if use_cache else None
+    if cache:
+        cached = cache.get(model, messages)
+        if cached is not None:
+            return cached
+
+    response, _ = client.generate(model_name=model, prompt=messages, echo=False)
+    if cache:
+        cache.set(model, messages, response)
     return str(response)
 
+def text_generation_many(prompts: List[str], model: str, max_concurrency: int = 4, use_cache: bool = True,
+                         on_result: Optional[Callable[[int, Optional[str]], None]] = None,
+                         options: Optional[Dict[str, Any]] = None) -> List[Optional[str]]:
+    """
+    Generates text for a batch of prompts concurrently, preserving the input order.
+
+    Parameters:
+    prompts (List[str]): The message prompts.
+    model (str): The model to be used for text generation.
+    max_concurrency (int): Maximum number of requests in flight against the Ollama server.
+    use_cache (bool): Serve already generated prompts from the generation cache.
+    on_result (Optional[Callable[[int, Optional[str]], None]]): Called with the index and text of each prompt as soon as
+        it completes. The text is None when the request failed.
+    options (Optional[Dict[str, Any]]): Ollama model options shared by every request, e.g. num_predict or stop.
+
+    Returns:
+    List[Optional[str]]: The generated texts, one per prompt; None for the requests that failed.
+    """
+    responses = generate_many(prompts, model, max_concurrency=max_concurrency, use_cache=use_cache,
+                              options=options, on_result=on_result)
+    return [None if response is None else str(response) for response in responses]
+
 def load_config(file_path: str) -> Dict:
     with open(file_path, 'r') as file:
         config = json.load(file)
@@ -194,9 +224,7 @@ THEMES = [
     "Educational Reforms"
 ]
 
-TOPICS_CLASSIFICATION_PROMPT_TEMPLATE = """
-I have a set of themes and a list of topics with corresponding keywords. Each topic is associated with only one theme (the most related one) based on the context provided by its keywords. Your task is to classify each topic into only one theme (the most related one) below based on its keywords. If a topic clearly aligns with multiple themes, assign it to the most relevant one. The themes are as follows:
-
+THEMES_DESCRIPTION = """
 - **Technological Innovation**: Keywords related to innovation, technology, AI, machine learning, software, etc.
 - **Societal Impact**: Keywords related to society, community, social structures, demographics, etc.
 - **Regulatory Changes**: Keywords related to law, policy, regulation, compliance, etc.
@@ -205,42 +233,199 @@ I have a set of themes and a list of topics with corresponding keywords. Each to
 - **Environmental Shifts**: Keywords related to the environment, climate, sustainability, green initiatives, etc.
 - **Cultural Evolution**: Keywords related to culture, art, media, entertainment, traditions, etc.
 - **Educational Reforms**: Keywords related to education, learning, schools, universities, pedagogy, etc.
+"""
+
+TOPICS_CLASSIFICATION_PROMPT_TEMPLATE = """
+I have a set of themes and a list of topics with corresponding keywords. Each topic is associated with only one theme (the most related one) based on the context provided by its keywords. Your task is to classify each topic into only one theme (the most related one) below based on its keywords. If a topic clearly aligns with multiple themes, assign it to the most relevant one. The themes are as follows:
+
+""" + THEMES_DESCRIPTION.strip() + """
 
 For the topic "{topic}" with the following keywords: {keywords}, classify it into only one theme (the most related one) from the list above. Please, just give the attributed theme, no additional comments.
 """
 
-def classify_topics_into_themes(df: pl.DataFrame) -> pl.DataFrame:
+TOPICS_BATCH_CLASSIFICATION_PROMPT_TEMPLATE = """
+I have a set of themes and a list of topics with corresponding keywords. Each topic is associated with only one theme (the most related one) based on the context provided by its keywords. Your task is to classify each topic into only one theme (the most related one) below based on its keywords. If a topic clearly aligns with multiple themes, assign it to the most relevant one. The themes are as follows:
+
+""" + THEMES_DESCRIPTION.strip() + """
+
+Here are the topics, one per line, each followed by its keywords:
+
+{topics}
+
+Classify every topic into only one theme (the most related one) from the list above. Answer only with a JSON object mapping each topic, written exactly as above, to its attributed theme, e.g. {{"Topic A": "Societal Impact", "Topic B": "Environmental Shifts"}}. No additional comments.
+"""
+
+# Theme -> description, as listed in THEMES_DESCRIPTION, used to embed the themes
+THEME_DESCRIPTIONS = dict(re.findall(r"- \*\*(.+?)\*\*: (.+)", THEMES_DESCRIPTION))
+
+def preclassify_themes_by_embedding(texts: List[str], embedding_model: str,
+                                    min_margin: float = 0.05) -> List[Optional[str]]:
     """
-    Classify a list of topics into predefined themes based on associated keywords.
+    Attribute themes to topics by embedding similarity, leaving ambiguous topics undecided.
 
     Args:
-        df (pl.DataFrame): A Polars DataFrame with columns 'Topic', 'Keyword', and 'Description'.
+        texts (List[str]): The topic texts to classify, e.g. the topic followed by its keywords.
+        embedding_model (str): The Ollama embedding model.
+        min_margin (float): Minimum gap between the cosine similarities of the best and second best themes
+            for the best theme to be attributed directly.
 
     Returns:
-        pl.DataFrame: A Polars DataFrame containing the topics, keywords, descriptions, and attributed themes.
+        List[Optional[str]]: The attributed theme of each text, or None when the margin is too small or the
+            embeddings could not be computed.
+    """
+    themes = list(THEME_DESCRIPTIONS)
+    if not texts:
+        return []
+    vectors = embed(texts + [f"{theme}: {THEME_DESCRIPTIONS[theme]}" for theme in themes], embedding_model)
+    if vectors is None:
+        return [None] * len(texts)
+
+    # Cosine similarities of every topic to every theme, in one matrix product
+    similarities = vectors[:len(texts)] @ vectors[len(texts):].T
+    ranked = np.sort(similarities, axis=1)
+    margins = ranked[:, -1] - ranked[:, -2]
+    best = similarities.argmax(axis=1)
+    return [themes[b] if margin >= min_margin else None for b, margin in zip(best, margins)]
+
+def themes_from_response(response: str) -> str:
     """
-    # Define a function to classify each row
-    def classify_row(row):
-        topic, keyword_list, description = row
+    Extract the themes mentioned in a classification response.
 
-        # Create a specific prompt for the current topic and its keywords
-        specific_prompt = TOPICS_CLASSIFICATION_PROMPT_TEMPLATE.format(
-            topic=topic, keywords=", ".join(keyword_list)
-        )
+    Args:
+        response (str): The model response.
 
-        # Generate a response using the model
-        response = text_generation(specific_prompt, "llama3")
+    Returns:
+        str: The mentioned themes, comma-separated, in THEMES order.
+    """
+    return ", ".join(theme for theme in THEMES if theme.lower() in response.lower())
 
-        # Search for the mentioned themes in the response
-        attributed_themes = []
-        for theme in THEMES:
-            if theme.lower() in response.lower():
-                attributed_themes.append(theme)
+def parse_batch_classification(response: str, topics: List[str]) -> Dict[str, str]:
+    """
+    Parse the JSON mapping returned for a batched classification prompt.
 
-        return ", ".join(attributed_themes)
+    Args:
+        response (str): The model response, expected to contain a JSON object of topic -> theme.
+        topics (List[str]): The topics of the batch.
 
-    # Apply the classify_row function to each row using map_rows
-    attributed_themes = df.select(["Topic", "Keyword", "Description"]).map_rows(classify_row)
+    Returns:
+        Dict[str, str]: The attributed themes of the topics that could be parsed. Topics missing from the
+            answer, or mapped to no known theme, are left out.
+    """
+    start, end = response.find("{"), response.rfind("}")
+    if start == -1 or end <= start:
+        return {}
+    try:
+        mapping = json.loads(response[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(mapping, dict):
+        return {}
+
+    # Match topics case-insensitively, as models often alter the casing
+    answers = {str(topic).strip().lower(): str(theme) for topic, theme in mapping.items()}
+    parsed = {}
+    for topic in topics:
+        themes = themes_from_response(answers.get(topic.strip().lower(), ""))
+        if themes:
+            parsed[topic] = themes
+    return parsed
+
+def classify_topics_into_themes(df: pl.DataFrame, max_concurrency: int = 4,
+                                known_themes: Optional[Dict[str, str]] = None,
+                                on_classified: Optional[Callable[[str, str], None]] = None,
+                                model: str = "llama3",
+                                batch_size: Optional[int] = None,
+                                embedding_model: Optional[str] = None,
+                                min_margin: float = 0.05) -> pl.DataFrame:
+    """
+    Classify a list of topics into predefined themes based on associated keywords.
+
+    Args:
+        df (pl.DataFrame): A Polars DataFrame with columns 'Topic', 'Keyword', and 'Description'.
+        max_concurrency (int): Maximum number of classification requests in flight at once.
+        known_themes (Optional[Dict[str, str]]): Themes already attributed to some topics, e.g. from a checkpoint.
+            These topics are not sent to the model again.
+        on_classified (Optional[Callable[[str, str], None]]): Called with the topic and its attributed themes as
+            soon as each classification completes.
+        model (str): The model used for classification.
+        batch_size (Optional[int]): Classify this many topics per request with a single JSON-answer prompt.
+            Topics whose answer cannot be parsed fall back to one request each. One request per topic if None.
+        embedding_model (Optional[str]): Embed topics and themes with this Ollama model first, and only send
+            the topics without a clear nearest theme to the LLM.
+        min_margin (float): Minimum similarity gap between the two nearest themes to skip the LLM.
+
+    Returns:
+        pl.DataFrame: A Polars DataFrame containing the topics, keywords, descriptions, and attributed themes.
+    """
+    known_themes = known_themes or {}
+    rows = df.select(["Topic", "Keyword"]).rows()
+    attributed_themes = [known_themes.get(topic) for topic, _ in rows]
+    pending = [i for i, themes in enumerate(attributed_themes) if themes is None]
+
+    def attribute(i: int, themes: str) -> None:
+        attributed_themes[i] = themes
+        if on_classified:
+            on_classified(rows[i][0], themes)
+
+    if embedding_model and pending:
+        # Attribute the topics with a clear nearest theme directly and escalate the ambiguous ones
+        def n_calls(n: int) -> int:
+            return -(-n // batch_size) if batch_size and n > 1 else n
+
+        calls_before = n_calls(len(pending))
+        nearest = preclassify_themes_by_embedding(
+            [f"{rows[i][0]}: {', '.join(rows[i][1] or [])}" for i in pending], embedding_model, min_margin
+        )
+        for i, theme in zip(pending, nearest):
+            if theme:
+                attribute(i, theme)
+        pending = [i for i in pending if attributed_themes[i] is None]
+        print(f"Embedding pre-classifier attributed {len(nearest) - len(pending)} of {len(nearest)} topics, "
+              f"saving {calls_before - n_calls(len(pending))} LLM calls.")
+
+    if batch_size and len(pending) > 1:
+        # Pack the pending topics into batches answered with one JSON mapping each
+        batches = [pending[k:k + batch_size] for k in range(0, len(pending), batch_size)]
+        batch_prompts = [
+            TOPICS_BATCH_CLASSIFICATION_PROMPT_TEMPLATE.format(topics="\n".join(
+                f'- "{rows[i][0]}": {", ".join(rows[i][1] or [])}' for i in batch
+            ))
+            for batch in batches
+        ]
+
+        def store_batch(batch_index: int, response: Optional[str]) -> None:
+            # Failed requests leave their topics to the per-topic fallback
+            if not response:
+                return
+            batch = batches[batch_index]
+            parsed = parse_batch_classification(response, [rows[i][0] for i in batch])
+            for i in batch:
+                if rows[i][0] in parsed:
+                    attribute(i, parsed[rows[i][0]])
+
+        text_generation_many(batch_prompts, model, max_concurrency=max_concurrency, on_result=store_batch)
+
+        # Fall back to one request per topic for the topics the batches failed to classify
+        pending = [i for i in pending if attributed_themes[i] is None]
+        if pending:
+            print(f"Falling back to per-topic classification for {len(pending)} topics.")
+
+    # Create a specific prompt for each remaining topic and its keywords
+    prompts = [
+        TOPICS_CLASSIFICATION_PROMPT_TEMPLATE.format(topic=rows[i][0], keywords=", ".join(rows[i][1]))
+        for i in pending
+    ]
+
+    # Search for the mentioned themes in each response as it arrives
+    # Failed requests leave their topics unclassified, so they are retried on the next run
+    def store(pending_index: int, response: Optional[str]) -> None:
+        if not response:
+            return
+        i = pending[pending_index]
+        attribute(i, themes_from_response(response))
+
+    # Generate all responses concurrently
+    text_generation_many(prompts, model, max_concurrency=max_concurrency, on_result=store)
 
     # Add the 'Attributed Themes' column to the DataFrame
     result_df = df.with_columns(